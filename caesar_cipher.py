@@ -5,7 +5,15 @@ https://en.wikipedia.org/wiki/Caesar_cipher
 
 """
 
+import argparse
+import os
 import string
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from math import gcd
+
+import numpy as np
 import pytest
 
 # Number operations.
@@ -42,6 +50,360 @@ def encode_message(m, shift=0):
 def decode_message(m, shift=0):
     return ''.join(map(lambda l: decode_letter(l, shift), m))
 
+# Table operations.
+#
+# The message operations above are the reference implementation. The tables
+# below precompute the same mapping once per (shift, alphabets), so a whole
+# message is enciphered by a single `translate` (or NumPy lookup) with no
+# Python call per character. Each alphabet is rotated by `shift` on its own;
+# characters outside every alphabet pass through unchanged.
+
+UPPERCASE = (string.ascii_uppercase,)
+CASE_PRESERVING = (string.ascii_uppercase, string.ascii_lowercase)
+PRINTABLE = (''.join(map(chr, range(ord(' '), ord('~') + 1))),)
+
+ALPHABETS = {'upper': UPPERCASE, 'case': CASE_PRESERVING, 'printable': PRINTABLE}
+
+def alphabet_range(first, last):
+    """ Alphabet of the code points `first` to `last` inclusive """
+    return ''.join(map(chr, range(ord(first), ord(last) + 1)))
+
+def rotate(alphabet, shift=0):
+    """ `alphabet` rotated left by `shift` """
+    shift %= len(alphabet)
+    return alphabet[shift:] + alphabet[:shift]
+
+@lru_cache(maxsize=1024)
+def str_table(shift=0, alphabets=UPPERCASE):
+    """ `str.translate` table for `shift` """
+    source = ''.join(alphabets)
+    if len(set(source)) != len(source):
+        raise ValueError(f"alphabets repeat a character: {alphabets!r}")
+    return str.maketrans(source, ''.join(rotate(a, shift) for a in alphabets))
+
+@lru_cache(maxsize=1024)
+def bytes_table(shift=0, alphabets=UPPERCASE):
+    """ `bytes.translate` table for `shift` """
+    table = bytearray(range(256))
+    for code, target in str_table(shift, alphabets).items():
+        if code > 255:
+            raise ValueError(f"alphabets are not single-byte: {alphabets!r}")
+        table[code] = target
+    return bytes(table)
+
+@lru_cache(maxsize=1024)
+def array_table(shift=0, alphabets=UPPERCASE):
+    """ uint8 lookup table for `shift` """
+    table = np.frombuffer(bytes_table(shift, alphabets), dtype=np.uint8)
+    table.flags.writeable = False
+    return table
+
+def encode_fast(m, shift=0, alphabets=UPPERCASE):
+    """ Encode a `str`, `bytes` or `bytearray` message with one `translate` """
+    if isinstance(m, str):
+        return m.translate(str_table(shift, alphabets))
+    return m.translate(bytes_table(shift, alphabets))
+
+def decode_fast(m, shift=0, alphabets=UPPERCASE):
+    """ Decode a `str`, `bytes` or `bytearray` message with one `translate` """
+    return encode_fast(m, -shift, alphabets)
+
+def encode_array(a, shift=0, out=None, alphabets=UPPERCASE):
+    """ Encode a uint8 array of byte codes; `out` may be `a` for in-place """
+    return np.take(array_table(shift, alphabets), a, out=out)
+
+def decode_array(a, shift=0, out=None, alphabets=UPPERCASE):
+    """ Decode a uint8 array of byte codes; `out` may be `a` for in-place """
+    return encode_array(a, -shift, out, alphabets)
+
+# Stream operations.
+#
+# Streams are read and written one chunk at a time, so memory stays bounded
+# by `chunk_size` whatever the size of the input. A reader is anything with
+# `read(n)`: text or binary files, pipes, `io.BytesIO` or `mmap.mmap`.
+
+CHUNK_SIZE = 2**20
+
+def encode_stream(reader, writer, shift=0, chunk_size=CHUNK_SIZE,
+                  alphabets=UPPERCASE):
+    """ Encode `reader` into `writer` chunk by chunk; return characters written """
+    total = 0
+    while True:
+        chunk = reader.read(chunk_size)
+        if not chunk:
+            return total
+        writer.write(encode_fast(chunk, shift, alphabets))
+        total += len(chunk)
+
+def decode_stream(reader, writer, shift=0, chunk_size=CHUNK_SIZE,
+                  alphabets=UPPERCASE):
+    """ Decode `reader` into `writer` chunk by chunk; return characters written """
+    return encode_stream(reader, writer, -shift, chunk_size, alphabets)
+
+
+# Parallel operations.
+#
+# The shift is position independent, so a buffer can be cut into shards and
+# each shard enciphered by a different process. The payload is copied once
+# into shared memory and every worker rewrites its own slice in place; only
+# the block name and slice bounds are pickled, and output order is simply the
+# buffer order.
+
+def _encode_shard(name, start, stop, shift, alphabets):
+    from multiprocessing import shared_memory  # Python 3.8+
+    block = shared_memory.SharedMemory(name=name)
+    try:
+        shard = np.ndarray((stop - start,), dtype=np.uint8,
+                           buffer=block.buf, offset=start)
+        encode_array(shard, shift, out=shard, alphabets=alphabets)
+        del shard
+    finally:
+        block.close()
+
+def _shards(size, count):
+    """ (start, stop) bounds of `count` near-equal slices of `size` """
+    bounds = np.linspace(0, size, count + 1, dtype=np.int64)
+    return [(int(a), int(b)) for a, b in zip(bounds[:-1], bounds[1:]) if a < b]
+
+def encode_parallel(data, shift=0, workers=None, executor=None,
+                    alphabets=UPPERCASE):
+    """ Encode a bytes-like buffer across `workers` processes; return bytes """
+    workers = workers or os.cpu_count()
+    if not data:
+        return bytes(data)
+
+    from multiprocessing import shared_memory  # Python 3.8+
+    block = shared_memory.SharedMemory(create=True, size=len(data))
+    try:
+        block.buf[:len(data)] = data
+        pool = executor or ProcessPoolExecutor(workers)
+        try:
+            futures = [pool.submit(_encode_shard, block.name, start, stop,
+                                   shift, alphabets)
+                       for start, stop in _shards(len(data), workers)]
+            for future in futures:
+                future.result()
+        finally:
+            if executor is None:
+                pool.shutdown()
+        return bytes(block.buf[:len(data)])
+    finally:
+        block.close()
+        block.unlink()
+
+def decode_parallel(data, shift=0, workers=None, executor=None,
+                    alphabets=UPPERCASE):
+    """ Decode a bytes-like buffer across `workers` processes; return bytes """
+    return encode_parallel(data, -shift, workers, executor, alphabets)
+
+def encode_batch(messages, shift=0, workers=None, executor=None,
+                 alphabets=UPPERCASE):
+    """ Encode a list of `str` messages in parallel; return them in order """
+    if not ''.join(alphabets).isascii():
+        raise ValueError(f"batch alphabets must be ASCII: {alphabets!r}")
+    encoded = [m.encode('utf-8') for m in messages]
+    offsets = np.cumsum([0] + [len(m) for m in encoded])
+    joined = encode_parallel(b''.join(encoded), shift, workers, executor,
+                             alphabets)
+    return [joined[a:b].decode('utf-8') for a, b in zip(offsets[:-1], offsets[1:])]
+
+def decode_batch(messages, shift=0, workers=None, executor=None,
+                 alphabets=UPPERCASE):
+    """ Decode a list of `str` messages in parallel; return them in order """
+    return encode_batch(messages, -shift, workers, executor, alphabets)
+
+
+# Cracking operations.
+#
+# An unknown shift is recovered from ciphertext by frequency analysis. The
+# letter histogram is counted once; decoding with shift `s` only rotates that
+# histogram, so all 26 candidate shifts are scored against English letter
+# frequencies (chi-squared) without decoding the text again. Histograms for
+# many messages are stacked and scored in one NumPy pass.
+
+# https://en.wikipedia.org/wiki/Letter_frequency
+ENGLISH_FREQUENCIES = np.array([
+    8.167, 1.492, 2.782, 4.253, 12.702, 2.228, 2.015, 6.094, 6.966,
+    0.153, 0.772, 4.025, 2.406, 6.749, 7.507, 1.929, 0.095, 5.987,
+    6.327, 9.056, 2.758, 0.978, 2.360, 0.150, 1.974, 0.074]) / 100
+
+# _ROTATIONS[s, i] is the ciphertext letter that decodes to letter `i`.
+_ROTATIONS = (np.arange(26)[:, None] + np.arange(26)[None, :]) % 26
+
+def _as_codes(m):
+    """ uint8 view of a `str` or bytes-like message """
+    if isinstance(m, str):
+        m = m.encode('utf-8')
+    return np.frombuffer(m, dtype=np.uint8)
+
+def _letter_numbers(codes):
+    """ Letter number (0-25) of every A-Z or a-z code, case folded """
+    return (codes[_is_letter(codes)] & 0xDF) - ord('A')
+
+def letter_histogram(m):
+    """ Counts of each letter A-Z in `m`, case folded """
+    return np.bincount(_letter_numbers(_as_codes(m)), minlength=26)
+
+def _join(messages):
+    """ Concatenated codes of `messages`, the owning message of each code and
+        the message offsets """
+    arrays = [_as_codes(m) for m in messages]
+    offsets = np.cumsum([0] + [len(a) for a in arrays])
+    owner = np.repeat(np.arange(len(arrays)), np.diff(offsets))
+    codes = np.concatenate(arrays) if arrays else np.empty(0, dtype=np.uint8)
+    return codes, owner, offsets
+
+def _is_letter(codes):
+    """ Mask of the A-Z and a-z codes """
+    folded = codes & 0xDF
+    return (folded >= ord('A')) & (folded <= ord('Z'))
+
+def letter_histograms(messages):
+    """ (len(messages), 26) letter counts, counted in one pass """
+    codes, owner, offsets = _join(messages)
+    count = len(offsets) - 1
+
+    letters = _is_letter(codes)
+    cells = owner[letters] * 26 + ((codes[letters] & 0xDF) - ord('A'))
+    return np.bincount(cells, minlength=26 * count).reshape(count, 26)
+
+def chi_squared_scores(histograms):
+    """ Chi-squared of each candidate shift; histograms (..., 26) -> (..., 26) """
+    histograms = np.asarray(histograms, dtype=np.float64)
+    totals = histograms.sum(axis=-1, keepdims=True)[..., None]
+    expected = np.maximum(totals, 1) * ENGLISH_FREQUENCIES
+    observed = histograms[..., _ROTATIONS]
+    return (((observed - expected) ** 2) / expected).sum(axis=-1)
+
+def crack_shift(m):
+    """ Most likely shift of an English ciphertext `m` """
+    return int(chi_squared_scores(letter_histogram(m)).argmin())
+
+def crack_shifts(messages):
+    """ Most likely shift of each English ciphertext in `messages` """
+    return chi_squared_scores(letter_histograms(messages)).argmin(axis=-1)
+
+# Rotation cipher family.
+#
+# Caesar, Vigenere and affine ciphers are all `a * n + b (mod 26)` in the
+# number space of `encode_number`, with `b` per letter for Vigenere. One
+# NumPy kernel applies that to every letter of a uint8 array at once (case
+# preserved, other bytes untouched); the ciphers only differ in how they
+# build `scale` and `shifts`. Batches of records with their own keys are
+# joined into one array and run through the kernel in a single pass.
+
+def modular_kernel(codes, scale=1, shifts=0, out=None):
+    """ Map every letter `n` of uint8 `codes` to `scale * n + shifts (mod 26)`;
+        `scale` and `shifts` are scalars or one value per letter """
+    codes = np.asarray(codes, dtype=np.uint8)
+    if out is None:
+        out = codes.copy()
+    elif out is not codes:
+        out[...] = codes
+
+    letters = _is_letter(codes)
+    base = (codes[letters] & 0x20) | ord('A')
+    numbers = (codes[letters] - base).astype(np.int64)
+    out[letters] = base + encode_number(scale * numbers, shifts)
+    return out
+
+def key_shifts(key):
+    """ Shift of each letter of a Vigenere `key` ('A' is 0) """
+    shifts = _letter_numbers(_as_codes(key)).astype(np.int64)
+    if not len(shifts):
+        raise ValueError(f"key has no letters: {key!r}")
+    return shifts
+
+def _like(m, codes):
+    """ `codes` as the same type as message `m` """
+    if isinstance(m, str):
+        return codes.tobytes().decode('utf-8')
+    return codes.tobytes()
+
+def _split(messages, codes, offsets):
+    return [_like(m, codes[a:b])
+            for m, a, b in zip(messages, offsets[:-1], offsets[1:])]
+
+# Multiplicative inverses of the 12 units mod 26.
+_INVERSES = {a: x for a in range(26) for x in range(26) if a * x % 26 == 1}
+
+def _affine_inverse(a, b):
+    """ (scale, shift) undoing `a * n + b (mod 26)` """
+    a_inv = _INVERSES[int(a) % 26]
+    return a_inv, -a_inv * b
+
+def vigenere_encode(m, key):
+    """ Vigenere encode `m`; the key advances on letters only """
+    codes = _as_codes(m)
+    shifts = np.resize(key_shifts(key), np.count_nonzero(_is_letter(codes)))
+    return _like(m, modular_kernel(codes, 1, shifts))
+
+def vigenere_decode(m, key):
+    """ Vigenere decode `m`; the key advances on letters only """
+    codes = _as_codes(m)
+    shifts = np.resize(key_shifts(key), np.count_nonzero(_is_letter(codes)))
+    return _like(m, modular_kernel(codes, 1, -shifts))
+
+def affine_encode(m, a=1, b=0):
+    """ Affine encode `m` as `a * n + b (mod 26)` """
+    if gcd(a, 26) != 1:
+        raise ValueError(f"affine key {a} is not coprime with 26")
+    return _like(m, modular_kernel(_as_codes(m), a, b))
+
+def affine_decode(m, a=1, b=0):
+    """ Affine decode `m` encoded as `a * n + b (mod 26)` """
+    if gcd(a, 26) != 1:
+        raise ValueError(f"affine key {a} is not coprime with 26")
+    return _like(m, modular_kernel(_as_codes(m), *_affine_inverse(a, b)))
+
+def _batch_key_shifts(owner, letters, keys):
+    """ Vigenere shift of every letter of joined records, one key per record """
+    key_list = [key_shifts(k) for k in keys]
+    lengths = np.array([len(k) for k in key_list], dtype=np.int64)
+    table = np.zeros((len(key_list), lengths.max(initial=1)), dtype=np.int64)
+    for row, shifts in zip(table, key_list):
+        row[:len(shifts)] = shifts
+
+    letter_owner = owner[letters]
+    counts = np.bincount(letter_owner, minlength=len(key_list))
+    first = np.cumsum(counts) - counts
+    position = np.arange(len(letter_owner)) - first[letter_owner]
+    return table[letter_owner, position % lengths[letter_owner]]
+
+def vigenere_encode_batch(messages, keys):
+    """ Vigenere encode each message with its own key, in one kernel pass """
+    codes, owner, offsets = _join(messages)
+    shifts = _batch_key_shifts(owner, _is_letter(codes), keys)
+    return _split(messages, modular_kernel(codes, 1, shifts), offsets)
+
+def vigenere_decode_batch(messages, keys):
+    """ Vigenere decode each message with its own key, in one kernel pass """
+    codes, owner, offsets = _join(messages)
+    shifts = _batch_key_shifts(owner, _is_letter(codes), keys)
+    return _split(messages, modular_kernel(codes, 1, -shifts), offsets)
+
+def affine_encode_batch(messages, a, b):
+    """ Affine encode each message with its own (a, b), in one kernel pass """
+    codes, owner, offsets = _join(messages)
+    a, b = np.asarray(a, dtype=np.int64), np.asarray(b, dtype=np.int64)
+    if (np.gcd(a, 26) != 1).any():
+        raise ValueError("affine keys must be coprime with 26")
+    letter_owner = owner[_is_letter(codes)]
+    encoded = modular_kernel(codes, a[letter_owner], b[letter_owner])
+    return _split(messages, encoded, offsets)
+
+def affine_decode_batch(messages, a, b):
+    """ Affine decode each message with its own (a, b), in one kernel pass """
+    codes, owner, offsets = _join(messages)
+    a, b = np.asarray(a, dtype=np.int64), np.asarray(b, dtype=np.int64)
+    if (np.gcd(a, 26) != 1).any():
+        raise ValueError("affine keys must be coprime with 26")
+    scale = np.array([_INVERSES[int(x) % 26] for x in a], dtype=np.int64)
+    letter_owner = owner[_is_letter(codes)]
+    decoded = modular_kernel(codes, scale[letter_owner],
+                             (-scale * b)[letter_owner])
+    return _split(messages, decoded, offsets)
+
 
 @pytest.mark.parametrize('cipher_shift', list(range(100)))
 def test_caesar_cipher(cipher_shift):
@@ -56,6 +418,172 @@ def test_caesar_cipher(cipher_shift):
     assert decoded == message
 
 
+@pytest.mark.parametrize('cipher_shift', [0, 1, 3, 25, 26, 99, -3])
+def test_fast_matches_reference(cipher_shift):
+
+    message = string.ascii_uppercase * 3
+
+    encoded = encode_message(message, shift=cipher_shift)
+
+    assert encode_fast(message, cipher_shift) == encoded
+    assert encode_fast(message.encode(), cipher_shift) == encoded.encode()
+    assert decode_fast(encoded, cipher_shift) == message
+
+
+def test_array_round_trip():
+
+    message = np.frombuffer(b'KATIE, KATIE!', dtype=np.uint8).copy()
+
+    encoded = encode_array(message, shift=3)
+    assert encoded.tobytes() == b'NDWLH, NDWLH!'
+
+    decode_array(encoded, shift=3, out=encoded)
+    assert encoded.tobytes() == message.tobytes()
+
+
+def test_case_preserving():
+
+    message = 'Katie, meet Zoe at 10:30!'
+
+    encoded = encode_fast(message, 3, CASE_PRESERVING)
+    assert encoded == 'Ndwlh, phhw Crh dw 10:30!'
+    assert encode_fast(message.encode(), 3, CASE_PRESERVING) == encoded.encode()
+    assert decode_fast(encoded, 3, CASE_PRESERVING) == message
+
+
+def test_configurable_alphabets():
+
+    printable = encode_fast('Hi ~', 1, PRINTABLE)
+    assert printable == 'Ij! '
+    assert decode_fast(printable, 1, PRINTABLE) == 'Hi ~'
+
+    greek = (alphabet_range('\u03b1', '\u03c9'),)
+    assert decode_fast(encode_fast('\u03b1\u03b2\u03b3', 5, greek), 5, greek) == '\u03b1\u03b2\u03b3'
+    assert str_table(5, greek) is str_table(5, greek)
+
+    with pytest.raises(ValueError):
+        encode_fast(b'abc', 1, greek)
+    with pytest.raises(ValueError):
+        encode_fast('abc', 1, (string.ascii_lowercase, 'xyz'))
+
+
+def test_modular_kernel_is_caesar():
+
+    message = np.frombuffer(b'Katie, KATIE!', dtype=np.uint8)
+
+    assert modular_kernel(message, 1, 3).tobytes() == \
+        encode_fast(b'Katie, KATIE!', 3, CASE_PRESERVING)
+
+
+def test_vigenere():
+
+    assert vigenere_encode('ATTACK AT DAWN', 'LEMON') == 'LXFOPV EF RNHR'
+    assert vigenere_decode(b'LXFOPV EF RNHR', 'LEMON') == b'ATTACK AT DAWN'
+
+    messages = ['ATTACK AT DAWN', 'Hello, World', '', 'xyz']
+    keys = ['LEMON', 'key', 'A', 'B']
+    encoded = vigenere_encode_batch(messages, keys)
+
+    assert encoded == [vigenere_encode(m, k) for m, k in zip(messages, keys)]
+    assert vigenere_decode_batch(encoded, keys) == messages
+
+
+def test_affine():
+
+    assert affine_encode('AFFINE CIPHER', 5, 8) == 'IHHWVC SWFRCP'
+    assert affine_decode('IHHWVC SWFRCP', 5, 8) == 'AFFINE CIPHER'
+    assert affine_encode('KATIE', 1, 3) == encode_fast('KATIE', 3)
+
+    messages = ['AFFINE CIPHER', 'Katie']
+    encoded = affine_encode_batch(messages, [5, 7], [8, 2])
+    assert encoded == [affine_encode('AFFINE CIPHER', 5, 8), affine_encode('Katie', 7, 2)]
+    assert affine_decode_batch(encoded, [5, 7], [8, 2]) == messages
+
+    with pytest.raises(ValueError):
+        affine_encode('KATIE', 13, 0)
+
+
+def test_stream_round_trip():
+    import io
+    import mmap
+
+    message = b'KATIE, KATIE!' * 1000
+
+    encoded = io.BytesIO()
+    assert encode_stream(io.BytesIO(message), encoded, 3, chunk_size=7) == len(message)
+    assert encoded.getvalue() == encode_fast(message, 3)
+
+    with mmap.mmap(-1, len(message)) as mapped:
+        mapped.write(encoded.getvalue())
+        mapped.seek(0)
+        decoded = io.BytesIO()
+        decode_stream(mapped, decoded, 3, chunk_size=64)
+    assert decoded.getvalue() == message
+
+    text = io.StringIO()
+    encode_stream(io.StringIO('KATIE'), text, 3, chunk_size=2)
+    assert text.getvalue() == 'NDWLH'
+
+
+def test_parallel_round_trip():
+
+    message = b'KATIE, KATIE!' * 1000
+
+    encoded = encode_parallel(message, 3, workers=2)
+    assert encoded == encode_fast(message, 3)
+    assert decode_parallel(encoded, 3, workers=3) == message
+
+    messages = ['KATIE', '', 'Caf\u00e9 ABC', 'XYZ']
+    assert encode_batch(messages, 3, workers=2) == [encode_fast(m, 3) for m in messages]
+
+
+PLAINTEXT = 'THE QUICK BROWN FOX JUMPS OVER THE LAZY DOG AND KEEPS RUNNING'
+
+
+@pytest.mark.parametrize('cipher_shift', [0, 3, 13, 25])
+def test_crack_shift(cipher_shift):
+
+    encoded = encode_fast(PLAINTEXT, cipher_shift)
+
+    assert crack_shift(encoded) == cipher_shift
+    assert decode_fast(encoded, crack_shift(encoded)) == PLAINTEXT
+
+
+def test_crack_shifts():
+
+    shifts = list(range(26)) * 4
+    messages = [encode_fast(PLAINTEXT, s) for s in shifts]
+    messages[1::2] = [m.lower() for m in messages[1::2]]
+
+    assert (letter_histograms(messages)[1] == letter_histogram(messages[1])).all()
+    assert crack_shifts(messages).tolist() == shifts
+    assert crack_shifts([]).shape == (0,)
+
+
+def main(argv=None):
+    """ Encode or decode a file or stdin to a file or stdout """
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('shift', type=int)
+    parser.add_argument('input', nargs='?', default='-')
+    parser.add_argument('output', nargs='?', default='-')
+    parser.add_argument('-d', '--decode', action='store_true')
+    parser.add_argument('-a', '--alphabet', choices=ALPHABETS, default='upper')
+    parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE)
+    args = parser.parse_args(argv)
+
+    stream = decode_stream if args.decode else encode_stream
+    reader = sys.stdin.buffer if args.input == '-' else open(args.input, 'rb')
+    writer = sys.stdout.buffer if args.output == '-' else open(args.output, 'wb')
+    try:
+        stream(reader, writer, args.shift, args.chunk_size,
+               ALPHABETS[args.alphabet])
+    finally:
+        if reader is not sys.stdin.buffer:
+            reader.close()
+        if writer is not sys.stdout.buffer:
+            writer.close()
+
+
 if __name__ == '__main__':
 
-    test_caesar_cipher(3)
+    main()
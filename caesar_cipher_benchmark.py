@@ -0,0 +1,82 @@
+"""
+Caesar Cipher benchmark.
+
+Characters per second for the reference, `translate` and NumPy paths, and
+for the process-parallel path as workers scale from 1 to the CPU count.
+
+    python caesar_cipher_benchmark.py
+
+"""
+
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from caesar_cipher import encode_array, encode_fast, encode_message, encode_parallel
+
+SIZES = {'1 KB': 2**10, '1 MB': 2**20, '100 MB': 100 * 2**20}
+
+# The reference path manages roughly a million characters per second, so it
+# is only timed on the smaller payloads.
+REFERENCE_LIMIT = 2**20
+
+
+def payload(size):
+    """ Random A-Z payload of `size` bytes """
+    rng = np.random.default_rng(0)
+    return rng.integers(ord('A'), ord('Z') + 1, size, dtype=np.uint8)
+
+
+def chars_per_sec(func, data, repeat=3):
+    """ Best of `repeat` runs of `func(data)` in characters per second """
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(data)
+        best = min(best, time.perf_counter() - start)
+    return len(data) / best
+
+
+def bench_caesar_cipher(shift=3):
+    """ Yield (label, path, chars/sec) rows """
+    for label, size in SIZES.items():
+        array = payload(size)
+        data = array.tobytes()
+        text = data.decode('ascii')
+
+        if size <= REFERENCE_LIMIT:
+            yield label, 'reference', chars_per_sec(
+                lambda m: encode_message(m, shift), text, repeat=1)
+
+        yield label, 'str.translate', chars_per_sec(
+            lambda m: encode_fast(m, shift), text)
+        yield label, 'bytes.translate', chars_per_sec(
+            lambda m: encode_fast(m, shift), data)
+
+        out = np.empty_like(array)
+        yield label, 'numpy', chars_per_sec(
+            lambda m: encode_array(m, shift, out=out), array)
+
+
+def bench_parallel(size=SIZES['100 MB'], shift=3):
+    """ Yield (workers, chars/sec) rows for 1 .. cpu_count workers """
+    data = payload(size).tobytes()
+    for workers in range(1, os.cpu_count() + 1):
+        with ProcessPoolExecutor(workers) as executor:
+            encode_parallel(b'warm up', shift, workers, executor)
+            yield workers, chars_per_sec(
+                lambda m: encode_parallel(m, shift, workers, executor), data)
+
+
+if __name__ == '__main__':
+
+    print(f"{'size':>8}  {'path':<16}{'chars/sec':>16}")
+    for label, path, rate in bench_caesar_cipher():
+        print(f"{label:>8}  {path:<16}{rate:>16,.0f}")
+
+    print()
+    print(f"{'workers':>8}  {'chars/sec':>16}")
+    for workers, rate in bench_parallel():
+        print(f"{workers:>8}  {rate:>16,.0f}")
@@ -14,10 +14,19 @@ https://github.com/pandas-dev/pandas/issues/21910
 
 """
 
+import types
+import typing
+from functools import lru_cache
+from itertools import islice
+from operator import attrgetter
+
+import numpy as np
 import pandas as pd
 import pytest
 from dataclasses import dataclass
 from dataclasses import asdict
+from dataclasses import field
+from dataclasses import fields
 
 #
 # dataclasses
@@ -31,6 +40,311 @@ class SimpleDataObject:
 dataclass_object1 = SimpleDataObject(1, 'a')
 dataclass_object2 = SimpleDataObject(2, 'b')
 
+#
+# conversion
+#
+
+# Column dtypes for annotations; anything else is stored as objects.
+DTYPES = {
+    int: np.dtype('int64'),
+    float: np.dtype('float64'),
+    bool: np.dtype('bool'),
+    complex: np.dtype('complex128'),
+}
+
+# Nullable forms for `Optional[...]` annotations.
+OPTIONAL_DTYPES = {
+    int: 'Int64',
+    float: np.dtype('float64'),
+    bool: 'boolean',
+}
+
+
+# Type of `X | None` annotations (Python 3.10+).
+_UNION_TYPE = getattr(types, 'UnionType', None)
+
+
+def _optional(annotation):
+    """(X, True) for `Optional[X]` or `X | None`, else (annotation, False)."""
+    # `__origin__`/`__args__` rather than `typing.get_origin`/`get_args`,
+    # which need Python 3.8.
+    if getattr(annotation, '__origin__', None) is typing.Union \
+            or type(annotation) is _UNION_TYPE:
+        args = [a for a in getattr(annotation, '__args__', ()) if a is not type(None)]
+        if len(args) == 1:
+            return args[0], True
+    return annotation, False
+
+
+def column_dtype(annotation):
+    """Column dtype for a field annotation."""
+    annotation, optional = _optional(annotation)
+    if optional:
+        return OPTIONAL_DTYPES.get(annotation, np.dtype(object))
+    return DTYPES.get(annotation, np.dtype(object))
+
+
+def column_dtypes(cls):
+    """{field name: column dtype} of dataclass `cls`."""
+    hints = typing.get_type_hints(cls)
+    return {f.name: column_dtype(hints.get(f.name, f.type)) for f in fields(cls)}
+
+
+def _column(values, dtype, count):
+    if isinstance(dtype, np.dtype) and dtype != object:
+        return np.fromiter(values, dtype, count)
+    column = np.empty(count, dtype=object)
+    column[:] = values
+    return column if dtype == object else pd.array(column, dtype=dtype)
+
+
+def from_dataclasses(objs, cls=None):
+    """DataFrame with a column per field of `cls` and a row per object.
+
+    Fields are read with one `attrgetter` call per object and transposed,
+    so no per-object dict is built; numeric columns go straight into NumPy
+    arrays of the annotated type.
+    """
+    objs = objs if isinstance(objs, (list, tuple)) else list(objs)
+    if cls is None:
+        if not objs:
+            raise ValueError("cls is required to convert no objects")
+        cls = type(objs[0])
+    dtypes = column_dtypes(cls)
+    names = list(dtypes)
+
+    if len(names) == 1:
+        columns = [list(map(attrgetter(names[0]), objs))]
+    elif objs:
+        columns = list(zip(*map(attrgetter(*names), objs)))
+    else:
+        columns = [() for _ in names]
+
+    return pd.DataFrame({name: _column(values, dtypes[name], len(objs))
+                         for name, values in zip(names, columns)},
+                        columns=names)
+
+def _values(series):
+    """Column values as a NumPy array, with missing values as None for
+    pandas extension dtypes."""
+    if isinstance(series.dtype, np.dtype):
+        return series.to_numpy()
+    return series.to_numpy(dtype=object, na_value=None)
+
+
+def _scalar(value):
+    return value.item() if isinstance(value, np.generic) else value
+
+
+def _init_names(cls):
+    return [f.name for f in fields(cls) if f.init]
+
+
+def _iter_dataclasses(columns, cls, chunk_size):
+    for start in range(0, len(columns[0]) if columns else 0, chunk_size):
+        yield from map(cls, *(c[start:start + chunk_size].tolist() for c in columns))
+
+
+@lru_cache(maxsize=None)
+def row_view_class(cls):
+    """`__slots__` class whose instances read the fields of `cls` from one
+    row of a set of column arrays."""
+    names = _init_names(cls)
+
+    def column(i):
+        return property(lambda self: _scalar(self._columns[i][self._row]))
+
+    def __init__(self, columns, row):
+        self._columns = columns
+        self._row = row
+
+    def astuple(self):
+        return tuple(_scalar(c[self._row]) for c in self._columns)
+
+    def to_dataclass(self):
+        return cls(*self.astuple())
+
+    def __eq__(self, other):
+        if isinstance(other, cls):
+            other = tuple(getattr(other, name) for name in names)
+        elif isinstance(other, view):
+            other = other.astuple()
+        else:
+            return NotImplemented
+        return self.astuple() == other
+
+    def __repr__(self):
+        values = ', '.join(f"{name}={value!r}" for name, value in zip(names, self.astuple()))
+        return f"{view.__name__}({values})"
+
+    namespace = {name: column(i) for i, name in enumerate(names)}
+    namespace.update(__slots__=('_columns', '_row'), __init__=__init__,
+                     astuple=astuple, to_dataclass=to_dataclass,
+                     __eq__=__eq__, __hash__=None, __repr__=__repr__)
+    view = type(f"{cls.__name__}View", (), namespace)
+    return view
+
+
+def to_dataclasses(df, cls, lazy=False, view=False, chunk_size=65536):
+    """Instances of `cls`, one per row of `df`.
+
+    The column arrays are zipped straight into the constructor, so no dict
+    is built per row. `lazy=True` returns a generator that converts
+    `chunk_size` rows at a time. `view=True` returns `row_view_class(cls)`
+    objects that wrap a row index into the column arrays instead of copying
+    the values.
+    """
+    columns = tuple(_values(df[name]) for name in _init_names(cls))
+    if view:
+        view_class = row_view_class(cls)
+        views = (view_class(columns, row) for row in range(len(df)))
+        return views if lazy else list(views)
+    if lazy:
+        return _iter_dataclasses(columns, cls, chunk_size)
+    if not columns:
+        return [cls() for _ in range(len(df))]
+    return list(map(cls, *(c.tolist() for c in columns)))
+
+#
+# streaming
+#
+
+def dataframe_chunks(objs, cls=None, chunk_size=65536):
+    """DataFrames of up to `chunk_size` rows from an iterable of dataclass
+    objects; only one chunk of objects is held at a time."""
+    objs = iter(objs)
+    while True:
+        chunk = list(islice(objs, chunk_size))
+        if not chunk:
+            return
+        yield from_dataclasses(chunk, cls)
+
+
+def read_frames(path, cls, chunk_size=65536, format=None):
+    """DataFrames of up to `chunk_size` rows of the `cls` fields, read from
+    a CSV or Parquet file a chunk at a time."""
+    names = _init_names(cls)
+    format = format or ('parquet' if str(path).endswith(('.parquet', '.pq')) else 'csv')
+    if format == 'csv':
+        # Object columns are kept as read, so '007' in a str field stays '007'.
+        dtypes = {name: dtype for name, dtype in column_dtypes(cls).items()
+                  if name in names}
+        yield from pd.read_csv(path, usecols=names, dtype=dtypes, chunksize=chunk_size)
+    elif format == 'parquet':
+        import pyarrow.parquet as pq
+        with pq.ParquetFile(path) as f:
+            for batch in f.iter_batches(batch_size=chunk_size, columns=names):
+                yield batch.to_pandas()
+    else:
+        raise ValueError(f"unknown format: {format!r}")
+
+
+def read_dataclasses(path, cls, chunk_size=65536, format=None):
+    """Instances of `cls`, one per row of a CSV or Parquet file, converted a
+    chunk of `chunk_size` rows at a time."""
+    for df in read_frames(path, cls, chunk_size, format):
+        yield from to_dataclasses(df, cls)
+
+#
+# validation
+#
+
+@dataclass(frozen=True)
+class ColumnSchema:
+    """Checks for one column: its annotated type, whether it may hold
+    nulls, and optional bounds (from `field(metadata={'min': .., 'max': ..})`)."""
+    name: str
+    type: typing.Any
+    nullable: bool = False
+    min: typing.Any = None
+    max: typing.Any = None
+
+
+class ValidationError(ValueError):
+    """Rows of a DataFrame that do not match a dataclass schema; `failures`
+    maps (column, check) to the failing index labels."""
+
+    def __init__(self, failures):
+        self.failures = failures
+        summary = ', '.join(f"{column} {check}: {len(rows)} rows"
+                            for (column, check), rows in failures.items())
+        super().__init__(f"invalid rows ({summary})")
+
+
+@lru_cache(maxsize=None)
+def schema(cls):
+    """ColumnSchema of each field of dataclass `cls`, from its annotations."""
+    hints = typing.get_type_hints(cls)
+    columns = []
+    for f in fields(cls):
+        kind, nullable = _optional(hints.get(f.name, f.type))
+        bounds = f.metadata.get('min'), f.metadata.get('max')
+        if kind in (str, bool) and bounds != (None, None):
+            raise TypeError(f"min/max of field {f.name!r} need a numeric type, "
+                            f"not {kind.__name__}")
+        columns.append(ColumnSchema(f.name, kind, nullable, *bounds))
+    return tuple(columns)
+
+
+def _type_mask(series, kind):
+    """True where a non-null value of `series` is not of type `kind`, and the
+    values as numbers for the range checks."""
+    present = series.notna()
+    if kind is bool:
+        if pd.api.types.is_bool_dtype(series.dtype):
+            return present & False, None
+        return present & ~series.isin([True, False]), None
+    if kind in (int, float):
+        if pd.api.types.is_bool_dtype(series.dtype):
+            return present, None
+        numbers = series if pd.api.types.is_numeric_dtype(series.dtype) \
+            else pd.to_numeric(series, errors='coerce')
+        bad = present & numbers.isna()
+        if kind is int and not pd.api.types.is_integer_dtype(numbers.dtype):
+            bad |= present & numbers.notna() & (numbers % 1 != 0)
+        return bad, numbers.where(~bad)
+    if kind is str:
+        if pd.api.types.is_string_dtype(series.dtype) and series.dtype != object:
+            return present & False, None
+        return present & ~series.map(type).eq(str), None
+    return present & False, series
+
+
+def find_invalid(df, cls):
+    """{(column, check): failing index labels} of `df` against the schema of
+    `cls`, with the checks run a whole column at a time."""
+    failures = {}
+
+    def report(column, check, mask):
+        if mask.any():
+            failures[column, check] = df.index[mask.to_numpy(dtype=bool)]
+
+    for column in schema(cls):
+        if column.name not in df:
+            failures[column.name, 'missing'] = df.index
+            continue
+        series = df[column.name]
+        if not column.nullable:
+            report(column.name, 'null', series.isna())
+        bad, values = _type_mask(series, column.type)
+        report(column.name, 'type', bad)
+        # No values to compare when the whole column has the wrong type.
+        if values is None:
+            continue
+        if column.min is not None:
+            report(column.name, 'min', values.lt(column.min).fillna(False))
+        if column.max is not None:
+            report(column.name, 'max', values.gt(column.max).fillna(False))
+    return failures
+
+
+def validate(df, cls):
+    """`df`, if it matches the schema of `cls`; else raise ValidationError."""
+    failures = find_invalid(df, cls)
+    if failures:
+        raise ValidationError(failures)
+    return df
+
 #
 # tests
 #
@@ -90,3 +404,154 @@ def test_dataframe_to_dataclass():
     record_objects = [SimpleDataObject(**rec) for rec in records]
 
     assert record_objects == dataclass_objects
+
+
+def test_from_dataclasses():
+
+    _df = pd.DataFrame(columns=['field_a', 'field_b'], data=[[1, 'a'], [2, 'b']])
+
+    df = from_dataclasses([dataclass_object1, dataclass_object2], SimpleDataObject)
+
+    assert _df.equals(df)
+    assert df.dtypes.equals(_df.dtypes)
+
+    empty = from_dataclasses([], SimpleDataObject)
+    assert list(empty.columns) == ['field_a', 'field_b']
+    assert empty['field_a'].dtype == np.dtype('int64')
+
+
+def test_from_dataclasses_dtypes():
+
+    @dataclass
+    class Reading:
+        sensor: str
+        value: float
+        count: typing.Optional[int]
+        ok: bool
+
+    df = from_dataclasses([Reading('x', 1.5, 3, True), Reading('y', 2.0, None, False)])
+
+    assert df['value'].dtype == np.dtype('float64')
+    assert str(df['count'].dtype) == 'Int64'
+    assert df['count'].isna().tolist() == [False, True]
+    assert df['ok'].tolist() == [True, False]
+
+
+def test_to_dataclasses():
+
+    df = pd.DataFrame(columns=['field_a', 'field_b'], data=[[1, 'a'], [2, 'b']])
+
+    dataclass_objects = [dataclass_object1, dataclass_object2]
+
+    assert to_dataclasses(df, SimpleDataObject) == dataclass_objects
+    assert type(to_dataclasses(df, SimpleDataObject)[0].field_a) is int
+
+    lazy = to_dataclasses(df, SimpleDataObject, lazy=True, chunk_size=1)
+    assert not isinstance(lazy, list)
+    assert list(lazy) == dataclass_objects
+
+    df = from_dataclasses([SimpleDataObject(i, str(i)) for i in range(10)])
+    assert [x.field_a for x in to_dataclasses(df[::3], SimpleDataObject)] == [0, 3, 6, 9]
+
+
+def test_to_dataclasses_view():
+
+    df = pd.DataFrame(columns=['field_a', 'field_b'], data=[[1, 'a'], [2, 'b']])
+
+    views = to_dataclasses(df, SimpleDataObject, view=True)
+
+    assert views == [dataclass_object1, dataclass_object2]
+    assert views[1].field_b == 'b'
+    assert views[0].to_dataclass() == dataclass_object1
+    assert repr(views[0]) == "SimpleDataObjectView(field_a=1, field_b='a')"
+    assert not hasattr(views[0], '__dict__')
+
+    with pytest.raises(AttributeError):
+        views[0].field_c
+
+
+def test_dataframe_chunks():
+
+    objs = (SimpleDataObject(i, str(i)) for i in range(10))
+
+    frames = list(dataframe_chunks(objs, SimpleDataObject, chunk_size=4))
+
+    assert [len(df) for df in frames] == [4, 4, 2]
+    assert frames[2]['field_a'].tolist() == [8, 9]
+    assert list(dataframe_chunks([], SimpleDataObject)) == []
+
+
+def test_read_dataclasses(tmp_path):
+
+    objs = [SimpleDataObject(i, f"0{i}") for i in range(10)]
+    path = tmp_path / "objects.csv"
+    pd.concat(dataframe_chunks(objs, chunk_size=3)).to_csv(path, index=False)
+
+    chunks = read_frames(path, SimpleDataObject, chunk_size=4)
+    assert [len(df) for df in chunks] == [4, 4, 2]
+    assert list(read_dataclasses(path, SimpleDataObject, chunk_size=4)) == objs
+
+
+def test_read_dataclasses_parquet(tmp_path):
+
+    pytest.importorskip('pyarrow')
+
+    objs = [SimpleDataObject(i, f"x{i}") for i in range(10)]
+    path = tmp_path / "objects.parquet"
+    from_dataclasses(objs).to_parquet(path, row_group_size=4)
+
+    assert list(read_dataclasses(path, SimpleDataObject, chunk_size=3)) == objs
+
+
+def test_validate():
+
+    df = pd.DataFrame(columns=['field_a', 'field_b'], data=[[1, 'a'], [2, 'b']])
+
+    assert validate(df, SimpleDataObject) is df
+    assert schema(SimpleDataObject)[0] == ColumnSchema('field_a', int)
+
+    bad = pd.DataFrame({'field_a': [1, 2.5, None, 'x', 5],
+                        'field_b': ['a', 'b', 3, 'd', None]},
+                       index=[10, 11, 12, 13, 14])
+
+    failures = find_invalid(bad, SimpleDataObject)
+
+    assert failures['field_a', 'type'].tolist() == [11, 13]
+    assert failures['field_a', 'null'].tolist() == [12]
+    assert failures['field_b', 'type'].tolist() == [12]
+    assert failures['field_b', 'null'].tolist() == [14]
+
+    with pytest.raises(ValidationError) as error:
+        validate(bad, SimpleDataObject)
+    assert error.value.failures.keys() == failures.keys()
+    assert find_invalid(bad[['field_a']], SimpleDataObject)['field_b', 'missing'].size == 5
+
+
+def test_validate_ranges_and_optional():
+
+    @dataclass
+    class Score:
+        name: str
+        score: float = field(metadata={'min': 0, 'max': 100})
+        retakes: typing.Optional[int] = field(default=None, metadata={'min': 0})
+
+    df = pd.DataFrame({'name': ['a', 'b', 'c', 'd'],
+                       'score': [50.0, -1.0, 101.0, 100.0],
+                       'retakes': [0, None, -2, 1]})
+
+    failures = find_invalid(df, Score)
+
+    assert failures.keys() == {('score', 'min'), ('score', 'max'), ('retakes', 'min')}
+    assert failures['score', 'min'].tolist() == [1]
+    assert failures['score', 'max'].tolist() == [2]
+    assert failures['retakes', 'min'].tolist() == [2]
+
+    flags = pd.DataFrame({'name': ['a'], 'score': [True], 'retakes': [None]})
+    assert find_invalid(flags, Score).keys() == {('score', 'type')}
+
+    @dataclass
+    class Named:
+        name: str = field(metadata={'min': 'a'})
+
+    with pytest.raises(TypeError):
+        schema(Named)
@@ -0,0 +1,66 @@
+"""
+Dataclass to DataFrame benchmark.
+
+Rows per second for `from_dataclasses` against the `asdict` path used in
+`test_dataclass_to_dataframe`, and for `to_dataclasses` against the
+`to_dict(orient='records')` path used in `test_dataframe_to_dataclass`.
+
+    python dataframe/dataframe_dataclass_benchmark.py [rows]     # default 1_000_000
+
+"""
+
+import sys
+import time
+from itertools import chain
+from dataclasses import asdict, dataclass
+
+import pandas as pd
+
+from dataframe_dataclass import from_dataclasses, to_dataclasses
+
+
+@dataclass
+class Record:
+    id: int
+    name: str
+    price: float
+    quantity: int
+    active: bool
+
+
+def records(rows):
+    return [Record(i, f"item{i % 1000}", i * 0.5, i % 7, i % 2 == 0)
+            for i in range(rows)]
+
+
+def timed(func, *args):
+    start = time.perf_counter()
+    func(*args)
+    return time.perf_counter() - start
+
+
+def bench_from_dataclasses(rows=1_000_000):
+    """ Yield (method, rows per second) rows """
+    objs = records(rows)
+    yield 'asdict', rows / timed(lambda: pd.DataFrame([asdict(x) for x in objs]))
+    yield 'from_dataclasses', rows / timed(from_dataclasses, objs, Record)
+
+
+def bench_to_dataclasses(rows=1_000_000):
+    """ Yield (method, rows per second) rows """
+    df = from_dataclasses(records(rows), Record)
+    yield 'to_dict records', \
+        rows / timed(lambda: [Record(**r) for r in df.to_dict(orient='records')])
+    yield 'to_dataclasses', rows / timed(to_dataclasses, df, Record)
+    yield 'to_dataclasses lazy', \
+        rows / timed(lambda: sum(1 for _ in to_dataclasses(df, Record, lazy=True)))
+    yield 'to_dataclasses view', \
+        rows / timed(lambda: to_dataclasses(df, Record, view=True))
+
+
+if __name__ == '__main__':
+
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    print(f"{'method':<20}{'rows/sec':>14}")
+    for method, rate in chain(bench_from_dataclasses(rows), bench_to_dataclasses(rows)):
+        print(f"{method:<20}{rate:>14,.0f}")
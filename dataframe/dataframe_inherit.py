@@ -2,18 +2,117 @@
 
 http://devanla.com/case-for-inheriting-from-pandas-dataframe.html
 
+`DomainDF` is a base for such subclasses. Derived frames keep the subclass
+and the attributes named in `_metadata`. Aggregates declared with
+`cached_aggregate` are computed once per version of the data: every
+mutation through `df[...] = `, `del`, `insert`, `pop`, `update`,
+`.loc`/`.iloc`/`.at`/`.iat` assignment, axis assignment or an `inplace=True`
+method bumps the version, so the next read recomputes them.
 
 """
 
+import functools
+
 import pandas as pd
 
-class StudentsDF(pd.DataFrame):
-    SCORES = 'scores'
-    NAMES = 'names'
+
+def _mutates(method):
+    """Wrap a `pd.DataFrame` method so a call bumps the data version."""
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        try:
+            return method(self, *args, **kwargs)
+        finally:
+            self._touch()
+    return wrapper
+
+
+class _Indexer:
+    """`.loc` and friends, bumping the frame's data version on assignment."""
+    __slots__ = ('_indexer', '_frame')
+
+    def __init__(self, indexer, frame):
+        self._indexer = indexer
+        self._frame = frame
+
+    def __getitem__(self, key):
+        return self._indexer[key]
+
+    def __setitem__(self, key, value):
+        try:
+            self._indexer[key] = value
+        finally:
+            self._frame._touch()
+
+    def __call__(self, axis=None):
+        return _Indexer(self._indexer(axis), self._frame)
+
+    def __getattr__(self, name):
+        return getattr(self._indexer, name)
+
+
+def _indexer(name):
+    get = getattr(pd.DataFrame, name).fget
+    return property(lambda self: _Indexer(get(self), self))
+
+
+def cached_aggregate(func):
+    """Property computing `func(df)` once per data version of `df`."""
+    name = func.__name__
+
+    @functools.wraps(func)
+    def aggregate(self):
+        if self._aggregates is None:
+            self._aggregates = {}
+        version, value = self._aggregates.get(name, (None, None))
+        if version != self._version:
+            value = func(self)
+            self._aggregates[name] = (self._version, value)
+        return value
+    return property(aggregate)
+
+
+class DomainDF(pd.DataFrame):
+    """DataFrame subclass that survives derivation and caches aggregates."""
+
+    _internal_names = pd.DataFrame._internal_names + ['_aggregates', '_version']
+    _internal_names_set = set(_internal_names)
+
+    _aggregates = None
+    _version = 0
 
     @property
     def _constructor(self):
-        return StudentsDF
+        return type(self)
+
+    def _touch(self):
+        self._version += 1
+
+    __setitem__ = _mutates(pd.DataFrame.__setitem__)
+    __delitem__ = _mutates(pd.DataFrame.__delitem__)
+    insert = _mutates(pd.DataFrame.insert)
+    pop = _mutates(pd.DataFrame.pop)
+    update = _mutates(pd.DataFrame.update)
+    isetitem = _mutates(pd.DataFrame.isetitem)
+    _set_value = _mutates(pd.DataFrame._set_value)
+    _set_axis = _mutates(pd.DataFrame._set_axis)
+    _update_inplace = _mutates(pd.DataFrame._update_inplace)
+
+    loc = _indexer('loc')
+    iloc = _indexer('iloc')
+    at = _indexer('at')
+    iat = _indexer('iat')
+
+
+class StudentsDF(DomainDF):
+    SCORES = 'scores'
+    NAMES = 'names'
+
+    _metadata = ['school']
+
+    @cached_aggregate
+    def mean_score(self):
+        return self[self.SCORES].mean()
 
 x = StudentsDF(data=dict(names=['Alice', 'Bob'],
                          scores=[60, 50]),
@@ -28,3 +127,57 @@ y = StudentsDF(data={StudentsDF.NAMES: ['Alice', 'Bob'],
                index=[100, 200])
 type(y)
 y
+
+y.school = 'Elm Street'
+y.mean_score            # 55.0, computed
+y.mean_score            # 55.0, cached
+y.loc[200, StudentsDF.SCORES] = 70
+y.mean_score            # 65.0, recomputed after the assignment
+y[y.scores > 60].school  # 'Elm Street'
+
+
+def test_students_df_metadata():
+
+    df = StudentsDF(data={StudentsDF.NAMES: ['Alice', 'Bob', 'Carol'],
+                          StudentsDF.SCORES: [60, 50, 70]})
+    df.school = 'Elm Street'
+
+    top = df[df.scores > 55]
+    assert type(top) is StudentsDF
+    assert top.school == 'Elm Street'
+    assert top.mean_score == 65
+    assert type(df.copy()) is StudentsDF
+    assert df.copy().school == 'Elm Street'
+
+
+def test_students_df_cache_invalidation():
+
+    calls = []
+
+    class CountingDF(StudentsDF):
+
+        @cached_aggregate
+        def mean_score(self):
+            calls.append(1)
+            return self[self.SCORES].mean()
+
+    df = CountingDF(data={StudentsDF.NAMES: ['Alice', 'Bob'],
+                          StudentsDF.SCORES: [60, 50]})
+
+    assert df.mean_score == 55 and df.mean_score == 55
+    assert len(calls) == 1
+
+    df.loc[1, StudentsDF.SCORES] = 70
+    assert df.mean_score == 65
+    df.iat[0, 1] = 80
+    assert df.mean_score == 75
+    df[StudentsDF.SCORES] = [10, 20]
+    assert df.mean_score == 15
+    df.drop(index=0, inplace=True)
+    assert df.mean_score == 20
+    assert len(calls) == 5
+
+    df.sort_values(StudentsDF.SCORES)
+    df.head()
+    assert df.mean_score == 20
+    assert len(calls) == 5
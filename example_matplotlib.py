@@ -6,3 +6,11 @@ import numpy as np
 # x = np.linspace(0, 20, 100)
 # plt.plot(x, np.sin(x))
 # plt.show() 
+
+#%%
+from plotting import plot_lod
+
+# x = np.linspace(0, 20, 10**8)
+# fig, ax = plt.subplots()
+# plot_lod(ax, x, np.sin(x))
+# plt.show()
@@ -11,10 +11,7 @@
 from toolz import compose, frequencies, partial
 from toolz.curried import map
 
-
-def stem(word):
-    """ Stem word to primitive form """
-    return word.lower().rstrip(",.!:;'-\"").lstrip("'\"")
+from wordcount import stem
 
 wordcount = compose(frequencies, map(stem), str.split)
 
@@ -22,6 +19,16 @@ sentence = "This cat jumped over this other cat!"
 wordcount(sentence)
 # {'this': 2, 'cat': 2, 'jumped': 1, 'over': 1, 'other': 1}
 
+# %%
+#
+# Fused: count raw tokens, then stem each distinct token once.
+#
+
+import wordcount as fused
+
+fused.wordcount(sentence) == wordcount(sentence)
+# True
+
 # %%
 print("sentance: {}".format(sentence))
 print("split: {}".format(str.split(sentence)))
@@ -53,6 +60,18 @@ add1 = add(y=1)
 
 add1(2, echo=True)
 
+#%%
+#
+# Curry, with the signature bound once (drop-in for `toolz.curry`).
+#
+
+from functional.fast_curry import curry as fast_curry
+
+fast_add = fast_curry(add.func)
+
+fast_add(x=1, echo=True)(y=2)
+fast_add(1)(2)
+
 #%%
 #
 # Compose / Do.
@@ -85,6 +104,24 @@ inc(11)
 
 print(f"log = {log}")
 
+#%%
+#
+# Do, with a bounded log that flushes to a file off the hot path.
+#
+
+import os
+import tempfile
+
+from functional.log_sink import LogSink
+
+with tempfile.TemporaryDirectory() as tmp, \
+        LogSink(os.path.join(tmp, "log.txt"), capacity=1024, sample_every=10) as sink:
+    tapped = compose(lambda x: x + 1, do(sink.append))
+    for x in range(1000):
+        tapped(x)
+
+print(f"sink.log[-3:] = {sink.log[-3:]}, dropped = {sink.dropped}")
+
 
 #%%
 #
@@ -108,4 +145,16 @@ double_then_str = program(double, str)   # TODO: How to do this with curried.pip
 double_then_str(3)
 
 
+#%%
+#
+# Compiled: one flat function instead of a `pipe` loop per call.
+#
+
+from functional.pipeline import compile_pipeline
+
+double_then_str = compile_pipeline(double, str)
+
+double_then_str(3)
+
+
 #%%
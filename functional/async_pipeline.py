@@ -0,0 +1,241 @@
+"""
+Async pipeline
+
+An asyncio executor for pipelines with I/O-bound stages, such as the
+`do(log.append)` tap in `example_toolz` or the file writes in
+`toolz_pipe`.
+
+Each stage runs as `concurrency` worker tasks reading from a bounded queue
+and writing to the next one. A stage may be a coroutine function, a plain
+function, or a blocking function run in a thread (`blocking=True`). When a
+queue is full its producer waits, so a slow stage holds back the source
+instead of letting items pile up in memory. Outputs come back in input
+order unless `ordered=False`; at most `maxsize` times the total worker
+count of items are between the source and the consumer at once, so a
+slow early item cannot make the reorder buffer grow without limit.
+`maxsize <= 0` means unbounded, as for `asyncio.Queue`: there is then no
+back-pressure and no limit on the reorder buffer.
+
+"""
+
+#%%
+import asyncio
+import inspect
+import time
+from dataclasses import dataclass
+from typing import Callable
+
+import pytest
+
+_DONE = object()
+
+
+@dataclass
+class Stage:
+    """ A pipeline stage, how many items it may work on at once, and whether
+        `func` blocks and so must run in a thread """
+    func: Callable
+    concurrency: int = 1
+    blocking: bool = False
+
+    async def __call__(self, item):
+        if self.blocking:
+            return await asyncio.get_running_loop().run_in_executor(None, self.func, item)
+        result = self.func(item)
+        if inspect.isawaitable(result):
+            result = await result
+        return result
+
+
+def stage(func, concurrency=1, blocking=False):
+    """ `Stage` of `func` with `concurrency` workers """
+    return Stage(func, concurrency, blocking)
+
+
+async def _source(items, queue, workers, window):
+    if hasattr(items, '__aiter__'):
+        index = 0
+        async for item in items:
+            if window is not None:
+                await window.acquire()
+            await queue.put((index, item))
+            index += 1
+    else:
+        for index, item in enumerate(items):
+            if window is not None:
+                await window.acquire()
+            await queue.put((index, item))
+    for _ in range(workers):
+        await queue.put(_DONE)
+
+
+async def _worker(step, inbox, outbox):
+    while True:
+        entry = await inbox.get()
+        if entry is _DONE:
+            return
+        index, item = entry
+        await outbox.put((index, await step(item)))
+
+
+async def _stage(step, inbox, outbox, next_workers):
+    await asyncio.gather(*(_worker(step, inbox, outbox)
+                           for _ in range(step.concurrency)))
+    for _ in range(next_workers):
+        await outbox.put(_DONE)
+
+
+async def apipe(items, *stages, maxsize=16, ordered=True):
+    """ Async generator of `items` passed through `stages` """
+    stages = [s if isinstance(s, Stage) else Stage(s) for s in stages]
+    queues = [asyncio.Queue(maxsize) for _ in range(len(stages) + 1)]
+    workers = [s.concurrency for s in stages] + [1]
+    # Items admitted but not yet yielded; bounds the reorder buffer.
+    window = None
+    if maxsize > 0:
+        window = asyncio.Semaphore(maxsize * max(sum(workers[:-1]), 1))
+
+    tasks = [asyncio.ensure_future(_source(items, queues[0], workers[0], window))]
+    tasks += [asyncio.ensure_future(_stage(s, queues[i], queues[i + 1], workers[i + 1]))
+              for i, s in enumerate(stages)]
+    failed = asyncio.ensure_future(_first_failure(tasks))
+
+    try:
+        pending, expected = {}, 0
+        while True:
+            getter = asyncio.ensure_future(queues[-1].get())
+            await asyncio.wait([getter, failed], return_when=asyncio.FIRST_COMPLETED)
+            if not getter.done():
+                getter.cancel()
+                failed.result()
+            entry = getter.result()
+            if entry is _DONE:
+                break
+            index, result = entry
+            if not ordered:
+                yield result
+                if window is not None:
+                    window.release()
+                continue
+            pending[index] = result
+            while expected in pending:
+                yield pending.pop(expected)
+                if window is not None:
+                    window.release()
+                expected += 1
+    finally:
+        for task in tasks + [failed]:
+            task.cancel()
+        await asyncio.gather(*tasks, failed, return_exceptions=True)
+
+
+async def _first_failure(tasks):
+    """ Raise the first exception among `tasks`, or wait forever """
+    for next_done in asyncio.as_completed(tasks):
+        await next_done
+    await asyncio.Event().wait()
+
+
+def run(items, *stages, maxsize=16, ordered=True):
+    """ List of `items` passed through `stages` """
+    async def collect():
+        return [result async for result in apipe(items, *stages, maxsize=maxsize,
+                                                 ordered=ordered)]
+    return asyncio.run(collect())
+
+#%%
+#
+# Tests.
+#
+
+async def slow_double(x):
+    await asyncio.sleep(0.01 * (x % 3))
+    return x * 2
+
+
+def test_run_ordered_and_concurrent():
+
+    in_flight, peak = 0, 0
+
+    async def tracked_double(x):
+        nonlocal in_flight, peak
+        in_flight += 1
+        peak = max(peak, in_flight)
+        try:
+            return await slow_double(x)
+        finally:
+            in_flight -= 1
+
+    results = run(range(30), stage(tracked_double, concurrency=10), str)
+
+    assert results == [str(x * 2) for x in range(30)]
+    assert peak > 1
+
+    unordered = run(range(30), stage(slow_double, concurrency=10), ordered=False)
+    assert sorted(unordered) == [x * 2 for x in range(30)]
+
+
+def test_blocking_stage_and_back_pressure():
+
+    produced = []
+
+    def write(x):
+        time.sleep(0.001)
+        return x
+
+    def source():
+        for x in range(100):
+            produced.append(x)
+            yield x
+
+    async def consume():
+        results = []
+        async for result in apipe(source(), stage(write, blocking=True),
+                                  maxsize=2):
+            results.append(result)
+            # Never more than the queues and workers can hold is in flight.
+            assert len(produced) - len(results) <= 2 * 3 + 2
+        return results
+
+    assert asyncio.run(consume()) == list(range(100))
+
+
+def test_reorder_buffer_is_bounded():
+
+    produced = []
+
+    async def slow_first(x):
+        await asyncio.sleep(0.2 if x == 0 else 0)
+        return x
+
+    def source():
+        for x in range(10_000):
+            produced.append(x)
+            yield x
+
+    async def first():
+        async for result in apipe(source(), stage(slow_first, concurrency=4),
+                                  maxsize=2):
+            return result, len(produced)
+
+    result, pulled = asyncio.run(first())
+    assert result == 0
+    # The window is maxsize * 4 workers; the source holds one more waiting.
+    assert pulled <= 2 * 4 + 1
+
+
+def test_unbounded_maxsize():
+
+    assert run(range(3), lambda x: x, maxsize=0) == [0, 1, 2]
+    assert sorted(run(range(3), slow_double, maxsize=-1, ordered=False)) == [0, 2, 4]
+
+
+def test_stage_error_propagates():
+
+    def fail(x):
+        if x == 5:
+            raise ValueError(x)
+        return x
+
+    with pytest.raises(ValueError):
+        run(range(10), fail, stage(slow_double, concurrency=2))
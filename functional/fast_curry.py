@@ -0,0 +1,248 @@
+"""
+Fast curry
+
+A drop-in for `toolz.functoolz.curry` for curried functions on hot paths.
+
+toolz tries the call and, when it raises `TypeError`, inspects the
+signature to tell a missing argument from a genuine error. Here the
+signature is read once per function, and each curry works out once how
+many more positional arguments complete it. A call with positional
+arguments only is then one length comparison away from the underlying
+`functools.partial`; keywords take a short check of the required names.
+
+"""
+
+#%%
+import inspect
+from functools import lru_cache, partial
+from importlib import import_module
+
+import pytest
+
+
+def _read_spec(func):
+    """ (required positional names, required keyword-only names) of `func`,
+        or None when the signature cannot be read """
+    try:
+        parameters = inspect.signature(func).parameters.values()
+    except (TypeError, ValueError):
+        return None
+    positional = tuple(p.name for p in parameters
+                       if p.kind in (p.POSITIONAL_ONLY, p.POSITIONAL_OR_KEYWORD)
+                       and p.default is p.empty)
+    keyword = frozenset(p.name for p in parameters
+                        if p.kind == p.KEYWORD_ONLY and p.default is p.empty)
+    return positional, keyword
+
+
+_spec = lru_cache(maxsize=1024)(_read_spec)
+
+
+class curry:
+    """ Curry a callable: call it once its required arguments are supplied,
+        otherwise return a curry holding the arguments so far """
+
+    __slots__ = ('func', 'args', 'keywords', '_partial', '_spec', '_needed',
+                 '_missing', '__dict__')
+
+    def __init__(self, func, *args, **keywords):
+        if isinstance(func, curry):
+            args = func.args + args
+            keywords = {**func.keywords, **keywords}
+            func = func.func
+        if not callable(func):
+            raise TypeError("Input must be callable")
+        self.func = func
+        self.args = args
+        self.keywords = keywords
+        self._partial = partial(func, *args, **keywords)
+        try:
+            spec = _spec(func)
+        except TypeError:
+            # Unhashable callables cannot key the cache.
+            spec = _read_spec(func)
+        self._spec = spec or ((), frozenset())
+        self.__doc__ = getattr(func, '__doc__', None)
+        self.__module__ = getattr(func, '__module__', None)
+        self.__qualname__ = getattr(func, '__qualname__', None)
+
+        # Required names the stored arguments leave open, and how many more
+        # positional arguments would fill them.
+        positional, keyword = self._spec
+        missing = [name for name in positional[len(args):] if name not in keywords]
+        self._missing = tuple(missing) + tuple(keyword - keywords.keys())
+        self._needed = 0
+        if keyword - keywords.keys():
+            self._needed = float('inf')
+        elif missing:
+            self._needed = positional.index(missing[-1]) + 1 - len(args)
+
+    def __call__(self, *args, **kwargs):
+        if not kwargs:
+            if len(args) >= self._needed:
+                return self._partial(*args)
+        elif not args:
+            for name in self._missing:
+                if name not in kwargs:
+                    break
+            else:
+                return self._partial(**kwargs)
+        return self._bind(args, kwargs)
+
+    def _bind(self, args, kwargs):
+        """ Call with the new arguments if that completes the call, else
+            curry them """
+        positional, keyword = self._spec
+        args = self.args + args
+        keywords = {**self.keywords, **kwargs}
+        # A keyword for a slot the positional arguments now fill could never
+        # complete the call.
+        for name in positional[:len(args)]:
+            if name in keywords:
+                raise TypeError(f"{self.__name__}() got multiple values for "
+                                f"argument {name!r}")
+        complete = keyword <= keywords.keys()
+        for name in positional[len(args):]:
+            if name not in keywords:
+                complete = False
+                break
+        if complete:
+            return self.func(*args, **keywords)
+        return curry(self.func, *args, **keywords)
+
+    def __get__(self, instance, owner):
+        if instance is None:
+            return self
+        return curry(self, instance)
+
+    @property
+    def __name__(self):
+        return getattr(self.func, '__name__', repr(self.func))
+
+    @property
+    def __wrapped__(self):
+        return self.func
+
+    @property
+    def __signature__(self):
+        return inspect.signature(self._partial)
+
+    def __reduce__(self):
+        # A module-level `@curry` function is pickled by reference, as its
+        # name resolves to the curry rather than to `func`.
+        func = self.func
+        module = getattr(func, '__module__', None)
+        qualname = getattr(func, '__qualname__', None)
+        if module and qualname and '<' not in qualname:
+            obj = import_module(module)
+            for attr in qualname.split('.'):
+                obj = getattr(obj, attr, None)
+            if isinstance(obj, curry) and obj.func is func:
+                func = (module, qualname)
+        return _restore, (type(self), func, self.args, self.keywords)
+
+    def __repr__(self):
+        return f"<curry {self.__name__} args={self.args!r} keywords={self.keywords!r}>"
+
+
+def _restore(cls, func, args, keywords):
+    if isinstance(func, tuple):
+        module, qualname = func
+        func = import_module(module)
+        for attr in qualname.split('.'):
+            func = getattr(func, attr)
+        func = func.func
+    return cls(func, *args, **keywords)
+
+#%%
+#
+# Tests.
+#
+
+@curry
+def add(x, y, echo=False):
+    return x + y
+
+
+def test_curry_positional():
+
+    assert add(1, 2) == 3
+    assert add(1)(2) == 3
+    assert add()(1)()(2) == 3
+    assert add(1, 2, True) == 3
+
+
+def test_curry_keywords():
+
+    plus1 = add(x=1, echo=True)
+    assert isinstance(plus1, curry)
+    assert plus1(y=2) == 3
+
+    add1 = add(y=1)
+    assert add1(2, echo=True) == 3
+    assert curry(add1)(5) == 6
+
+
+def test_curry_keyword_only_and_methods():
+
+    @curry
+    def scale(x, *, factor):
+        return x * factor
+
+    assert isinstance(scale(2), curry)
+    assert scale(2)(factor=3) == 6
+
+    class Adder:
+        n = 10
+
+        @curry
+        def add(self, x, y):
+            return self.n + x + y
+
+    assert Adder().add(1)(2) == 13
+    assert curry(max, 1)(2) == 2
+    assert curry(max, 1)(2, key=abs) == 2
+
+    with pytest.raises(TypeError):
+        curry(1)
+
+
+def test_curry_pickle_and_metadata():
+
+    import pickle
+
+    assert pickle.loads(pickle.dumps(add)).func is add.func
+    assert pickle.loads(pickle.dumps(add(1)))(2) == 3
+    assert pickle.loads(pickle.dumps(curry(max, 1)))(5) == 5
+
+    @curry
+    def documented(x, y):
+        """ Documented. """
+        return x
+
+    assert documented.__doc__ == " Documented. "
+    assert documented.__qualname__.endswith("documented")
+    assert documented.__module__ == __name__
+    assert str(inspect.signature(add(1))) == "(y, echo=False)"
+
+
+def test_curry_unhashable_callable():
+
+    from dataclasses import dataclass
+
+    @dataclass
+    class Scale:
+        factor: int
+
+        def __call__(self, x, y):
+            return self.factor * (x + y)
+
+    assert Scale.__hash__ is None
+    assert curry(Scale(2))(1)(1) == 4
+    assert curry(Scale(2), 1)(1) == 4
+
+
+def test_curry_keyword_in_positional_slot():
+
+    with pytest.raises(TypeError, match="multiple values"):
+        curry(add.func, x=1)(2)
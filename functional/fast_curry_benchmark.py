@@ -0,0 +1,45 @@
+"""
+Fast curry benchmark.
+
+Nanoseconds per call for `fast_curry.curry` against `toolz.curry`.
+
+    python functional/fast_curry_benchmark.py
+
+"""
+
+import timeit
+
+import toolz
+
+from fast_curry import curry
+
+
+def add(x, y, echo=False):
+    return x + y
+
+
+CASES = {
+    'plain function': 'f(1, 2)',
+    'all positional': 'c(1, 2)',
+    'partial positional': 'p(2)',
+    'keywords': 'k(y=2)',
+    'curry then call': 'c(1)(2)',
+}
+
+
+def bench_curry(number=200_000):
+    """ Yield (case, implementation, ns per call) rows """
+    for name, implementation in (('toolz', toolz.curry), ('fast', curry)):
+        c = implementation(add)
+        namespace = dict(f=add, c=c, p=c(1), k=c(x=1, echo=False))
+        for case, statement in CASES.items():
+            seconds = min(timeit.repeat(statement, globals=namespace,
+                                        number=number, repeat=7))
+            yield case, name, seconds / number * 1e9
+
+
+if __name__ == '__main__':
+
+    print(f"{'case':<22}{'curry':<8}{'ns/call':>10}")
+    for case, name, ns in bench_curry():
+        print(f"{case:<22}{name:<8}{ns:>10.0f}")
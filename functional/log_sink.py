@@ -0,0 +1,154 @@
+"""
+Log sink
+
+A bounded, non-blocking replacement for the `Log` tap in `example_toolz`
+
+    inc = compose(inc, do(log.append))
+
+`Log.append` prints and appends every element to a list that grows for the
+life of the job. `LogSink.append` only records the element in a ring buffer
+of fixed size; a background thread writes what is new to a file in
+batches, every `flush_every` elements or `flush_interval` seconds. If the
+writer falls more than `capacity` elements behind, the oldest are dropped
+and counted rather than blocking the pipeline. `sample_every=n` keeps one
+element in n.
+
+"""
+
+#%%
+import threading
+from collections import deque
+
+
+class LogSink:
+    """ Ring-buffered log tap with batched background flushing """
+
+    def __init__(self, path=None, capacity=1024, flush_every=256,
+                 flush_interval=1.0, sample_every=1, formatter=repr):
+        self.path = path
+        self.capacity = capacity
+        self.flush_every = flush_every
+        self.flush_interval = flush_interval
+        self.sample_every = sample_every
+        self.formatter = formatter
+
+        self.seen = 0
+        self.count = 0
+        self.flushed = 0
+        self.dropped = 0
+        self._ring = deque(maxlen=capacity)
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._closed = False
+
+        self._file = open(path, 'a') if path is not None else None
+        self._thread = None
+        if self._file is not None:
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+
+    def append(self, obj):
+        """ Record `obj`; never blocks on I/O """
+        self.seen += 1
+        if self.sample_every > 1 and self.seen % self.sample_every:
+            return
+        with self._lock:
+            self._ring.append(obj)
+            self.count += 1
+            due = self.count - self.flushed >= self.flush_every
+        if due and self._thread is not None:
+            self._wake.set()
+
+    __call__ = append
+
+    @property
+    def log(self):
+        """ The most recent records, oldest first """
+        with self._lock:
+            return list(self._ring)
+
+    def _take(self):
+        """ Records not yet flushed, counting any the ring already lost """
+        with self._lock:
+            new = self.count - self.flushed
+            kept = min(new, len(self._ring))
+            records = list(self._ring)[len(self._ring) - kept:] if kept else []
+            self.dropped += new - kept
+            self.flushed = self.count
+        return records
+
+    def flush(self):
+        """ Write the unflushed records to the file """
+        with self._write_lock:
+            records = self._take()
+            if records and self._file is not None:
+                self._file.write(''.join(self.formatter(r) + '\n' for r in records))
+                self._file.flush()
+
+    def _run(self):
+        while not self._closed:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            self.flush()
+
+    def close(self):
+        """ Stop the writer after a final flush """
+        self._closed = True
+        if self._thread is not None:
+            self._wake.set()
+            self._thread.join()
+            self.flush()
+            self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+#%%
+#
+# Tests.
+#
+
+def test_ring_buffer_is_bounded():
+
+    sink = LogSink(capacity=3)
+    for x in range(10):
+        sink(x)
+
+    assert sink.log == [7, 8, 9]
+    assert sink.count == 10
+
+    sampled = LogSink(sample_every=4)
+    for x in range(1, 13):
+        sampled.append(x)
+    assert sampled.log == [4, 8, 12]
+
+
+def test_flushes_in_background(tmp_path):
+
+    from toolz import compose
+    from toolz.curried import do
+
+    path = tmp_path / "log.txt"
+    with LogSink(path, capacity=100, flush_every=10, flush_interval=0.01) as sink:
+        inc = compose(lambda x: x + 1, do(sink.append))
+        results = [inc(x) for x in range(50)]
+
+    assert results == list(range(1, 51))
+    assert path.read_text().split() == [str(x) for x in range(50)]
+    assert sink.dropped == 0
+
+
+def test_drops_when_writer_lags(tmp_path):
+
+    sink = LogSink(tmp_path / "log.txt", capacity=5, flush_every=10**9,
+                   flush_interval=60)
+    for x in range(12):
+        sink(x)
+    sink.close()
+
+    assert (tmp_path / "log.txt").read_text().split() == ['7', '8', '9', '10', '11']
+    assert sink.dropped == 7
@@ -0,0 +1,252 @@
+"""
+Pipeline
+
+Compile a sequence of stages into one flat function.
+
+`toolz.pipe` loops over the stages on every call, and the cookbook
+`compose` built with `functools.reduce` nests one lambda per stage, so a
+call pays a Python frame per stage on top of the stages themselves.
+`compile_pipeline` generates the source of a single function
+
+    def pipeline(data):
+        data = _0(data)
+        data = _1(data)
+        ...
+        return data
+
+with the stages bound as free variables, so a call is one frame plus the
+stage calls. Nested compiled pipelines are inlined.
+
+`BatchPipeline` runs the same stages over many items a chunk at a time. A
+stage may declare a batch implementation (a list or NumPy array in, the
+same out) with `with_batch`; it is then called once per chunk, while runs
+of scalar-only stages are compiled together and mapped over the chunk.
+
+"""
+
+#%%
+import linecache
+import time
+import weakref
+from itertools import chain, count, islice
+
+import numpy as np
+import pytest
+
+_serial = count()
+
+
+def _flatten(stages):
+    for stage in stages:
+        if getattr(stage, 'stages', None) is not None and callable(stage):
+            yield from _flatten(stage.stages)
+        else:
+            yield stage
+
+
+def compile_pipeline(*stages, name='pipeline'):
+    """ One function applying `stages` left to right, like `toolz.pipe` """
+    if not name.isidentifier():
+        raise ValueError(f"pipeline name is not an identifier: {name!r}")
+    stages = tuple(_flatten(stages))
+    for stage in stages:
+        if not callable(stage):
+            raise TypeError(f"pipeline stage is not callable: {stage!r}")
+
+    # The generated function has a fixed name, so `name` cannot shadow a
+    # stage; it is applied afterwards.
+    names = [f"_{i}" for i in range(len(stages))]
+    lines = ["def _pipeline(data):"]
+    lines += [f"    data = {n}(data)" for n in names]
+    lines += ["    return data"]
+    source = "\n".join([f"def _make({', '.join(names)}):"]
+                       + ["    " + line for line in lines]
+                       + ["    return _pipeline", ""])
+
+    # Register the source so tracebacks through the pipeline show it, for as
+    # long as the pipeline lives.
+    filename = f"<pipeline-{next(_serial)}>"
+    linecache.cache[filename] = (len(source), None, source.splitlines(True), filename)
+
+    namespace = {}
+    exec(compile(source, filename, 'exec'), namespace)
+    pipeline = namespace['_make'](*stages)
+    pipeline.__name__ = pipeline.__qualname__ = name
+    pipeline.stages = stages
+    weakref.finalize(pipeline, linecache.cache.pop, filename, None)
+    return pipeline
+
+
+def compile_compose(*funcs, name='composed'):
+    """ One function applying `funcs` right to left, like `toolz.compose` """
+    return compile_pipeline(*reversed(funcs), name=name)
+
+#%%
+#
+# Batches.
+#
+
+def with_batch(batch):
+    """ Declare `batch` as the chunk-at-a-time form of the decorated stage """
+    def declare(stage):
+        stage.batch = batch
+        return stage
+    return declare
+
+
+def _segments(stages):
+    """ Batch stages as they are, runs of scalar stages compiled together """
+    segments, run = [], []
+    for stage in _flatten(stages):
+        if getattr(stage, 'batch', None) is None:
+            run.append(stage)
+            continue
+        if run:
+            segments.append((False, compile_pipeline(*run)))
+            run = []
+        segments.append((True, stage.batch))
+    if run:
+        segments.append((False, compile_pipeline(*run)))
+    return segments
+
+
+def _chunks(items, size):
+    if isinstance(items, np.ndarray):
+        for start in range(0, len(items), size):
+            yield items[start:start + size]
+        return
+    items = iter(items)
+    while True:
+        chunk = list(islice(items, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+class BatchPipeline:
+    """ Stages applied to many items, a chunk of `chunk_size` at a time """
+
+    def __init__(self, *stages, chunk_size=1024):
+        self.stages = tuple(_flatten(stages))
+        self.chunk_size = chunk_size
+        self._segments = _segments(self.stages)
+        self._scalar = compile_pipeline(*self.stages)
+
+    def __call__(self, item):
+        """ Run one item through the scalar stages """
+        return self._scalar(item)
+
+    def map_chunks(self, items):
+        """ Output chunks, in order """
+        for chunk in _chunks(items, self.chunk_size):
+            for is_batch, segment in self._segments:
+                chunk = segment(chunk) if is_batch else list(map(segment, chunk))
+            yield chunk
+
+    def map(self, items):
+        """ Outputs, in order """
+        return chain.from_iterable(self.map_chunks(items))
+
+    def tune(self, sample, sizes=(16, 64, 256, 1024, 4096, 16384, 65536)):
+        """ Set `chunk_size` to the fastest of `sizes` on `sample`; return it """
+        # Every size runs over the same items, so a one-shot iterator is
+        # materialised first.
+        if not isinstance(sample, np.ndarray):
+            sample = list(sample)
+        timings = {}
+        for size in sizes:
+            self.chunk_size = size
+            start = time.perf_counter()
+            for _ in self.map_chunks(sample):
+                pass
+            timings[size] = time.perf_counter() - start
+        self.chunk_size = min(timings, key=timings.get)
+        return self.chunk_size
+
+#%%
+#
+# Tests.
+#
+
+def double(x):
+    return x * 2
+
+
+def inc(x):
+    return x + 1
+
+
+def test_compile_pipeline():
+
+    double_then_str = compile_pipeline(double, str)
+
+    assert double_then_str(3) == '6'
+    assert compile_pipeline()(3) == 3
+    assert compile_compose(double, inc)(10) == 22
+
+
+def test_compile_pipeline_inlines_and_scales():
+
+    inner = compile_pipeline(inc, double)
+    outer = compile_pipeline(inner, inner, str)
+
+    assert outer.stages == (inc, double, inc, double, str)
+    assert outer(1) == '10'
+
+    assert compile_pipeline(*[inc] * 1000)(0) == 1000
+
+
+def test_compile_pipeline_errors():
+
+    with pytest.raises(TypeError):
+        compile_pipeline(inc, 3)
+
+    with pytest.raises(ZeroDivisionError):
+        compile_pipeline(inc, lambda x: x / 0)(1)
+
+
+def test_compile_pipeline_names_and_source():
+
+    for name in ('_0', '_make', 'data', '_pipeline'):
+        pipeline = compile_pipeline(inc, double, name=name)
+        assert pipeline(1) == 4
+        assert pipeline.__name__ == name
+
+    import gc
+
+    pipeline = compile_pipeline(inc)
+    filename = pipeline.__code__.co_filename
+    assert filename in linecache.cache
+    del pipeline
+    gc.collect()
+    assert filename not in linecache.cache
+
+
+def test_batch_pipeline():
+
+    @with_batch(lambda xs: np.asarray(xs) * 2)
+    def vector_double(x):
+        return x * 2
+
+    calls = []
+
+    @with_batch(lambda xs: calls.append(len(xs)) or [x + 1 for x in xs])
+    def batch_inc(x):
+        return x + 1
+
+    pipeline = BatchPipeline(inc, vector_double, batch_inc, str, chunk_size=4)
+
+    assert [s for s, _ in pipeline._segments] == [False, True, True, False]
+    assert list(pipeline.map(range(10))) == [str((i + 1) * 2 + 1) for i in range(10)]
+    assert calls == [4, 4, 2]
+    assert pipeline(3) == '9'
+
+    arrays = BatchPipeline(vector_double, chunk_size=3)
+    assert np.concatenate(list(arrays.map_chunks(np.arange(7)))).tolist() == \
+        [2 * i for i in range(7)]
+    assert arrays.tune(np.arange(1000), sizes=(10, 100)) in (10, 100)
+
+    timed = []
+    counting = BatchPipeline(lambda x: timed.append(x) or x)
+    counting.tune(iter(range(50)), sizes=(10, 100))
+    assert len(timed) == 100
@@ -0,0 +1,91 @@
+"""
+Pipeline benchmark.
+
+Microseconds per call of 10-, 50- and 200-stage pipelines built with
+`toolz.pipe`, `toolz.compose`, the cookbook `functools.reduce` compose and
+`compile_pipeline`; and items per second through a scalar pipeline
+against a `BatchPipeline` whose stages have NumPy batch forms.
+
+    python functional/pipeline_benchmark.py
+
+"""
+
+import functools
+import time
+import timeit
+
+import numpy as np
+from toolz import compose, pipe
+
+from pipeline import BatchPipeline, compile_pipeline, with_batch
+
+
+def inc(x):
+    return x + 1
+
+
+def program(*funcs):
+    return lambda data: pipe(data, *funcs)
+
+
+def reduce_compose(*functions):
+    return functools.reduce(lambda f, g: lambda x: f(g(x)),
+                            functions, lambda x: x)
+
+
+BUILDERS = {
+    'toolz.pipe': program,
+    'toolz.compose': lambda *funcs: compose(*reversed(funcs)),
+    'reduce compose': lambda *funcs: reduce_compose(*reversed(funcs)),
+    'compiled': compile_pipeline,
+}
+
+
+def bench_pipeline(lengths=(10, 50, 200), number=20_000):
+    """ Yield (stages, builder, us per call) rows """
+    for length in lengths:
+        stages = [inc] * length
+        for name, build in BUILDERS.items():
+            run = build(*stages)
+            assert run(0) == length
+            seconds = min(timeit.repeat(lambda: run(0), number=number, repeat=5))
+            yield length, name, seconds / number * 1e6
+
+
+@with_batch(lambda xs: np.asarray(xs) + 1)
+def batch_inc(x):
+    return x + 1
+
+
+@with_batch(lambda xs: np.asarray(xs) * 2)
+def batch_double(x):
+    return x * 2
+
+
+def bench_batch(items=10**6):
+    """ Yield (runner, items per second) rows """
+    data = np.arange(items)
+    stages = [batch_inc, batch_double] * 5
+
+    scalar = compile_pipeline(*stages)
+    start = time.perf_counter()
+    list(map(scalar, data.tolist()))
+    yield 'scalar, per item', items / (time.perf_counter() - start)
+
+    batched = BatchPipeline(*stages)
+    chunk_size = batched.tune(data[:2**17])
+    start = time.perf_counter()
+    list(batched.map_chunks(data))
+    yield f'batch, chunk {chunk_size}', items / (time.perf_counter() - start)
+
+
+if __name__ == '__main__':
+
+    print(f"{'stages':>6}  {'builder':<16}{'us/call':>10}")
+    for length, name, us in bench_pipeline():
+        print(f"{length:>6}  {name:<16}{us:>10.2f}")
+
+    print()
+    print(f"{'runner':<24}{'items/sec':>16}")
+    for name, rate in bench_batch():
+        print(f"{name:<24}{rate:>16,.0f}")
@@ -1,26 +1,479 @@
-""" integrate.py """
+""" integrate.py
+
+Numerical integration.
+
+Fixed-grid trapezoid and Simpson rules over NumPy arrays, running
+integrals of streamed samples, and adaptive Simpson quadrature with error
+control for vectorized callables.
+
+"""
 
 #%%
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from functools import partial
+
 import numpy as np
-import scipy.integrate
+import pytest
+from scipy.spatial import cKDTree
 
 def linear(x, m=1, c=0):
     return m*x + c
-    
-x = np.linspace(-1,1,5)
-y = linear(x)
 
-I = scipy.integrate.trapz(x,y)
+#%%
+#
+# Fixed grid.
+#
+# `y` may hold many integrands sampled on the same grid, one per row; every
+# rule integrates along `axis` and returns one value per integrand.
+#
+
+def _spacing(y, x, dx, axis):
+    """ Interval widths along `axis`, broadcastable against `y` """
+    if x is None:
+        return dx
+    h = np.diff(np.asarray(x, dtype=np.float64))
+    if h.ndim == 1:
+        shape = [1] * y.ndim
+        shape[axis] = -1
+        h = h.reshape(shape)
+    return h
+
+def _take(a, start, stop, axis, step=1):
+    """ a[..., start:stop:step, ...] along `axis` """
+    index = [slice(None)] * a.ndim
+    index[axis] = slice(start, stop, step)
+    return a[tuple(index)]
+
+def trapezoid(y, x=None, dx=1.0, axis=-1):
+    """ Trapezoid rule of samples `y` at `x` (or spacing `dx`) """
+    y = np.asarray(y, dtype=np.float64)
+    h = _spacing(y, x, dx, axis)
+    return np.sum(h * (_take(y, 1, None, axis) + _take(y, None, -1, axis)) / 2,
+                  axis=axis)
+
+def simpson(y, x=None, dx=1.0, axis=-1):
+    """ Composite Simpson rule of samples `y` at `x` (or spacing `dx`)
+
+        Grids need not be uniform. With an odd number of intervals the last
+        one is integrated with the three-point correction of the last pair.
+    """
+    y = np.asarray(y, dtype=np.float64)
+    n = y.shape[axis]
+    if n < 3:
+        return trapezoid(y, x, dx, axis)
+
+    h = _spacing(y, x, dx, axis)
+    if np.ndim(h) == 0:
+        h = np.full([n - 1 if i == axis % y.ndim else 1 for i in range(y.ndim)], h)
+
+    pairs = (n - 1) // 2 * 2
+    h0 = _take(h, 0, pairs, axis, 2)
+    h1 = _take(h, 1, pairs, axis, 2)
+    y0 = _take(y, 0, pairs, axis, 2)
+    y1 = _take(y, 1, pairs + 1, axis, 2)
+    y2 = _take(y, 2, pairs + 1, axis, 2)
+
+    total = np.sum((h0 + h1) / 6 * ((2 - h1 / h0) * y0
+                                    + (h0 + h1) ** 2 / (h0 * h1) * y1
+                                    + (2 - h0 / h1) * y2), axis=axis)
+
+    if pairs < n - 1:
+        h0, h1 = _take(h, -2, -1, axis), _take(h, -1, None, axis)
+        y0, y1, y2 = (_take(y, i, i + 1 or None, axis) for i in (-3, -2, -1))
+        total = total + np.sum(_last_interval(h0, h1, y0, y1, y2), axis=axis)
+
+    return total
+
+def _last_interval(h0, h1, y0, y1, y2):
+    """ Simpson estimate of the last interval (width h1) from the last three
+        samples, for grids with an odd number of intervals """
+    alpha = (2 * h1 ** 2 + 3 * h0 * h1) / (6 * (h0 + h1))
+    beta = (h1 ** 2 + 3 * h0 * h1) / (6 * h0)
+    eta = h1 ** 3 / (6 * h0 * (h0 + h1))
+    return alpha * y2 + beta * y1 - eta * y0
+
+#%%
+#
+# Online.
+#
+# Samples arrive in chunks and are folded into running trapezoid and Simpson
+# sums. Only the last three samples are kept between chunks: the Simpson sum
+# covers whole pairs of intervals, and a trailing odd interval is added with
+# the same last-interval correction as `simpson` when the value is read.
+#
+
+@dataclass
+class Checkpoint:
+    """ Cumulative integrals up to `x` """
+    x: float
+    samples: int
+    trapezoid: float
+    simpson: float
+
+class OnlineIntegrator:
+    """ Running integral of a stream of (x, y) samples """
+
+    def __init__(self):
+        self.samples = 0
+        self.checkpoints = []
+        self._trapezoid = 0.0
+        self._simpson = 0.0
+        self._tail_x = np.empty(0)
+        self._tail_y = np.empty(0)
+        self._last_x = np.empty(0)
+        self._last_y = np.empty(0)
+
+    def add(self, x, y):
+        """ Add a chunk of samples with increasing `x` """
+        x = np.atleast_1d(np.asarray(x, dtype=np.float64))
+        y = np.atleast_1d(np.asarray(y, dtype=np.float64))
+        if not len(x):
+            return self
+
+        joined_x = np.concatenate([self._last_x[-1:], x])
+        joined_y = np.concatenate([self._last_y[-1:], y])
+        self._trapezoid += float(trapezoid(joined_y, joined_x))
+
+        # The tail starts at the end of the last whole pair of intervals.
+        xs = np.concatenate([self._tail_x, x])
+        ys = np.concatenate([self._tail_y, y])
+        end = (len(xs) - 1) // 2 * 2
+        if end:
+            self._simpson += float(simpson(ys[:end + 1], xs[:end + 1]))
+        self._tail_x, self._tail_y = xs[end:], ys[end:]
+
+        self._last_x = np.concatenate([self._last_x, x])[-3:]
+        self._last_y = np.concatenate([self._last_y, y])[-3:]
+        self.samples += len(x)
+        return self
+
+    def extend(self, samples, chunk_size=4096):
+        """ Add (x, y) pairs from an iterable, `chunk_size` at a time """
+        chunk = []
+        for sample in samples:
+            chunk.append(sample)
+            if len(chunk) == chunk_size:
+                self.add(*zip(*chunk))
+                chunk = []
+        if chunk:
+            self.add(*zip(*chunk))
+        return self
+
+    @property
+    def trapezoid(self):
+        return self._trapezoid
+
+    @property
+    def simpson(self):
+        if len(self._tail_x) < 2:
+            return self._simpson
+        if self.samples == 2:
+            return self._trapezoid
+        x, y = self._last_x, self._last_y
+        return self._simpson + float(_last_interval(x[1] - x[0], x[2] - x[1], *y))
+
+    def checkpoint(self):
+        """ Record and return the cumulative integrals so far """
+        point = Checkpoint(x=float(self._last_x[-1]) if self.samples else np.nan,
+                           samples=self.samples, trapezoid=self.trapezoid,
+                           simpson=self.simpson)
+        self.checkpoints.append(point)
+        return point
+
+#%%
+#
+# Parameter sweeps.
+#
+# A parameterized integrand such as `linear(x, m, c)` is integrated for many
+# parameter sets at once by broadcasting: parameters become a column and the
+# grid a row, so `f` is evaluated for a block of parameter sets in one NumPy
+# call. Integrands that cannot broadcast are mapped over a process pool
+# instead, one parameter set per call.
+#
+
+def parameter_grid(**values):
+    """ Every combination of the given parameter values, as flat arrays """
+    names = list(values)
+    mesh = np.meshgrid(*(np.asarray(values[n], dtype=np.float64) for n in names),
+                       indexing='ij')
+    return {name: m.ravel() for name, m in zip(names, mesh)}
+
+def _integrate_params(f, x, rule, names, rows):
+    return [rule(np.broadcast_to(f(x, **dict(zip(names, row))), x.shape), x)
+            for row in rows]
+
+def sweep(f, x, rule=None, vectorized=True, chunk_size=1024, processes=None,
+          **params):
+    """ Integrate `f(x, **params)` over grid `x` for every parameter set
+
+        Parameters are equal-length arrays (see `parameter_grid`). Returns a
+        structured array with one field per parameter and `integral`.
+    """
+    rule = rule or simpson
+    x = np.asarray(x, dtype=np.float64)
+    names = list(params)
+    values = [np.asarray(params[n], dtype=np.float64).ravel() for n in names]
+    count = len(values[0]) if values else 1
+
+    result = np.zeros(count, dtype=[(n, np.float64) for n in names]
+                      + [('integral', np.float64)])
+    for name, column in zip(names, values):
+        result[name] = column
+
+    if vectorized:
+        for start in range(0, count, chunk_size):
+            block = {n: v[start:start + chunk_size, None] for n, v in zip(names, values)}
+            rows = len(next(iter(block.values()))) if block else 1
+            y = np.broadcast_to(f(x[None, :], **block), (rows, len(x)))
+            result['integral'][start:start + rows] = rule(y, x)
+    else:
+        rows = np.stack(values, axis=-1) if values else np.zeros((1, 0))
+        chunks = [rows[i:i + chunk_size] for i in range(0, count, chunk_size)]
+        with ProcessPoolExecutor(processes) as executor:
+            integrals = executor.map(partial(_integrate_params, f, x, rule, names),
+                                     chunks)
+            result['integral'] = np.concatenate([np.asarray(i) for i in integrals])
+
+    return result
+
+#%%
+#
+# Adaptive.
+#
+# Adaptive Simpson, refined a level at a time: every interval that misses
+# its share of the tolerance is split, and all new midpoints of a level are
+# evaluated in one call of `f`. `f` must accept an array of points; it may
+# return an array whose last axis matches the points, which integrates many
+# integrands at once (the worst one drives refinement).
+#
+
+@dataclass
+class Quadrature:
+    """ Adaptive integration result """
+    value: np.ndarray
+    error: np.ndarray
+    evaluations: int
+    converged: bool
+
+def _mask(values, keep):
+    return np.where(keep, values, 0.0)
+
+def quad(f, a, b, tol=1e-10, max_levels=30):
+    """ Integrate `f` over [a, b] to an absolute error of about `tol` """
+    a, b = float(a), float(b)
+    width = (b - a) or 1.0
+    left = np.array([a])
+    right = np.array([b])
+    f_left, f_mid, f_right = np.split(np.asarray(f(np.array([a, (a + b) / 2, b])),
+                                                 dtype=np.float64), 3, axis=-1)
+    whole = (right - left) / 6 * (f_left + 4 * f_mid + f_right)
+    evaluations = 3
+
+    value = np.zeros(whole.shape[:-1])
+    error = np.zeros(whole.shape[:-1])
+    converged = True
+
+    for level in range(max_levels + 1):
+        mid = (left + right) / 2
+        points = np.concatenate([(left + mid) / 2, (mid + right) / 2])
+        f_quarter, f_three_quarter = np.split(
+            np.asarray(f(points), dtype=np.float64), 2, axis=-1)
+        evaluations += len(points)
+
+        s_left = (mid - left) / 6 * (f_left + 4 * f_quarter + f_mid)
+        s_right = (right - mid) / 6 * (f_mid + 4 * f_three_quarter + f_right)
+        delta = s_left + s_right - whole
+        estimate = np.abs(delta) / 15
+        worst = estimate.reshape(-1, len(left)).max(axis=0)
+
+        done = worst <= tol * np.abs(right - left) / abs(width)
+        if level == max_levels:
+            converged = bool(done.all())
+            done[:] = True
+
+        value = value + np.sum(_mask(s_left + s_right + delta / 15, done), axis=-1)
+        error = error + np.sum(_mask(estimate, done), axis=-1)
+
+        if done.all():
+            break
+
+        todo = ~done
+        left, mid, right = left[todo], mid[todo], right[todo]
+        f_left, f_quarter, f_mid, f_three_quarter, f_right = (
+            v[..., todo] for v in (f_left, f_quarter, f_mid, f_three_quarter, f_right))
+        s_left, s_right = s_left[..., todo], s_right[..., todo]
+
+        left, right = np.concatenate([left, mid]), np.concatenate([mid, right])
+        f_left, f_mid, f_right = (np.concatenate(v, axis=-1) for v in (
+            (f_left, f_mid), (f_quarter, f_three_quarter), (f_mid, f_right)))
+        whole = np.concatenate([s_left, s_right], axis=-1)
+
+    return Quadrature(value=value, error=error, evaluations=evaluations,
+                      converged=converged)
+
+#%%
+#
+# Nearest index.
+#
+# `index` scans the whole array per query. `NearestIndex` sorts once and
+# answers each query with a binary search; ties resolve to the lowest
+# original index, as `argmin` does. `NearestPoint` does the same for
+# multi-dimensional points with a KD-tree.
+#
 
 def index(val, arr):
     """ See: https://philbull.wordpress.com/2012/01/11/numpy-tip-getting-index-of-an-array-element-nearest-to-some-value/"""
     return (np.abs(arr - val)).argmin()
 
-print("index = {}".format(str(index(x, 0.75))))
+class NearestIndex:
+    """ Index of the element of `arr` nearest to each query value """
+
+    def __init__(self, arr):
+        arr = np.asarray(arr, dtype=np.float64).ravel()
+        if not len(arr):
+            raise ValueError("NearestIndex needs at least one value")
+        self.order = np.argsort(arr, kind='stable')
+        self.sorted = arr[self.order]
+
+    def __call__(self, val):
+        val = np.asarray(val, dtype=np.float64)
+        if len(self.sorted) == 1:
+            return self.order[np.zeros(val.shape, dtype=np.intp)][()]
+
+        right = np.clip(np.searchsorted(self.sorted, val), 1, len(self.sorted) - 1)
+        left = np.searchsorted(self.sorted, self.sorted[right - 1])
+
+        to_left = np.abs(val - self.sorted[left])
+        to_right = np.abs(self.sorted[right] - val)
+        use_left = (to_left < to_right) | ((to_left == to_right)
+                                           & (self.order[left] < self.order[right]))
+        return self.order[np.where(use_left, left, right)][()]
+
+class NearestPoint:
+    """ Index of the point of `points` (n, d) nearest to each query (m, d) """
+
+    def __init__(self, points):
+        self.tree = cKDTree(np.asarray(points, dtype=np.float64))
+
+    def __call__(self, queries, workers=-1):
+        _, found = self.tree.query(np.asarray(queries, dtype=np.float64),
+                                   workers=workers)
+        return found
+
+#%%
+#
+# Tests.
+#
+
+def test_trapezoid_linear_is_exact():
+
+    x = np.linspace(-1, 1, 5)
+
+    assert trapezoid(linear(x), x) == pytest.approx(0.0)
+    assert trapezoid(linear(x, m=2, c=1), x) == pytest.approx(2.0)
+    assert trapezoid(linear(x, c=1), dx=0.5) == pytest.approx(2.0)
+
+
+def test_simpson():
+
+    uniform = np.linspace(0, 2, 7)
+    assert simpson(uniform ** 3, uniform) == pytest.approx(4.0)
+    assert simpson(uniform ** 3, dx=1 / 3) == pytest.approx(4.0)
+
+    for uneven in ([0.0, 0.1, 0.5, 0.6, 1.3, 2.0], [0.0, 0.1, 0.5, 1.3, 2.0]):
+        x = np.array(uneven)
+        y = np.vstack([x ** 2, linear(x, 3, 1)])
+        assert simpson(y, x) == pytest.approx([8 / 3, 8.0])
+
+
+def test_quad():
+
+    result = quad(np.sin, 0, np.pi, tol=1e-10)
+
+    assert result.value == pytest.approx(2.0, abs=1e-10)
+    assert result.converged
+    assert quad(np.sin, 1, 1).value == 0.0
+    assert quad(np.sin, np.pi, 0).value == pytest.approx(-2.0)
+
+    many = quad(lambda x: np.vstack([linear(x, 2, 1), np.exp(x)]), 0, 1)
+    assert many.value == pytest.approx([2.0, np.e - 1])
+
+
+def test_online_integrator():
+
+    rng = np.random.default_rng(0)
+    x = np.cumsum(rng.uniform(0.01, 0.1, 1001))
+    y = np.sin(x)
+
+    online = OnlineIntegrator()
+    for start in range(0, len(x), 97):
+        online.add(x[start:start + 97], y[start:start + 97])
+        stop = min(start + 97, len(x))
+        point = online.checkpoint()
+        assert point.x == x[stop - 1]
+        assert point.trapezoid == pytest.approx(trapezoid(y[:stop], x[:stop]))
+        assert point.simpson == pytest.approx(simpson(y[:stop], x[:stop]))
+
+    assert len(online.checkpoints) == 11
+
+    samples = OnlineIntegrator().extend(zip(x, y), chunk_size=10)
+    assert samples.samples == len(x)
+    assert samples.simpson == pytest.approx(simpson(y, x))
+
+
+def test_sweep():
+
+    x = np.linspace(-1, 1, 101)
+    grid = parameter_grid(m=np.arange(-3, 4), c=np.linspace(0, 1, 5))
+
+    swept = sweep(linear, x, **grid)
+
+    assert swept.dtype.names == ('m', 'c', 'integral')
+    assert swept['integral'] == pytest.approx(2 * swept['c'])
+
+    pooled = sweep(linear, x, rule=trapezoid, vectorized=False, chunk_size=8,
+                   processes=2, **grid)
+    assert pooled['integral'] == pytest.approx(2 * swept['c'])
+
+
+def test_nearest_index():
+
+    rng = np.random.default_rng(0)
+    arr = rng.integers(0, 50, 200).astype(float)
+    queries = np.concatenate([rng.uniform(-10, 60, 500), np.arange(-1, 51, 0.5)])
+
+    nearest = NearestIndex(arr)
+
+    assert nearest(queries).tolist() == [index(q, arr) for q in queries]
+    assert nearest(0.75) == index(0.75, arr)
+    assert NearestIndex([3.0])([1.0, 5.0]).tolist() == [0, 0]
+
+
+def test_nearest_point():
+
+    rng = np.random.default_rng(0)
+    points = rng.uniform(size=(300, 3))
+    queries = rng.uniform(size=(50, 3))
+
+    brute = np.linalg.norm(points[None, :, :] - queries[:, None, :], axis=-1).argmin(axis=1)
+
+    assert NearestPoint(points)(queries).tolist() == brute.tolist()
+
+
+if __name__ == '__main__':
+
+    x = np.linspace(-1,1,5)
+    y = linear(x)
+
+    I = trapezoid(y, x)
+
+    print("I = {}".format(I))
+    print("quad = {}".format(quad(linear, -1, 1)))
 
-x_int: list = []
+    print("index = {}".format(str(index(0.75, x))))
 
-print("Finished...")
+    print("Finished...")
 
 
 # %%
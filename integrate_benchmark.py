@@ -0,0 +1,106 @@
+"""
+Integrate benchmark.
+
+Accuracy against function evaluations for the fixed-grid rules and for
+adaptive quadrature, on a smooth integrand and a sharply peaked one;
+nearest-index lookups at 10^6 points x 10^5 queries; and a `linear`
+parameter sweep, looped against broadcast.
+
+    python integrate_benchmark.py
+
+"""
+
+import time
+
+import numpy as np
+
+from integrate import (NearestIndex, NearestPoint, index, linear, parameter_grid,
+                       quad, simpson, sweep, trapezoid)
+
+INTEGRANDS = {
+    'exp(x) on [0, 1]': (np.exp, 0.0, 1.0, np.e - 1),
+    'peak on [-1, 1]': (lambda x: 1 / (1e-4 + x ** 2), -1.0, 1.0,
+                        2 * np.arctan(100) / 1e-2),
+}
+
+
+def bench_fixed(rule, f, a, b, exact, sizes=(9, 33, 129, 1025, 16385)):
+    """ Yield (evaluations, abs error, seconds) rows for a fixed-grid rule """
+    for n in sizes:
+        start = time.perf_counter()
+        x = np.linspace(a, b, n)
+        value = rule(f(x), x)
+        yield n, abs(value - exact), time.perf_counter() - start
+
+
+def bench_quad(f, a, b, exact, tols=(1e-4, 1e-6, 1e-8, 1e-10, 1e-12)):
+    """ Yield (evaluations, abs error, seconds) rows for adaptive quadrature """
+    for tol in tols:
+        start = time.perf_counter()
+        result = quad(f, a, b, tol=tol)
+        yield result.evaluations, abs(result.value - exact), time.perf_counter() - start
+
+
+def bench_nearest(points=10**6, queries=10**5, scan_sample=100, dims=3):
+    """ Yield (method, seconds for all queries) rows """
+    rng = np.random.default_rng(0)
+    arr = rng.uniform(0, 1, points)
+    vals = rng.uniform(0, 1, queries)
+
+    # The argmin scan is timed on a sample and scaled up.
+    start = time.perf_counter()
+    for val in vals[:scan_sample]:
+        index(val, arr)
+    yield 'index (argmin scan)', (time.perf_counter() - start) * queries / scan_sample
+
+    start = time.perf_counter()
+    nearest = NearestIndex(arr)
+    built = time.perf_counter()
+    nearest(vals)
+    yield 'NearestIndex build', built - start
+    yield 'NearestIndex queries', time.perf_counter() - built
+
+    cloud = rng.uniform(0, 1, (points, dims))
+    targets = rng.uniform(0, 1, (queries, dims))
+    start = time.perf_counter()
+    tree = NearestPoint(cloud)
+    built = time.perf_counter()
+    tree(targets)
+    yield f'NearestPoint build ({dims}-D)', built - start
+    yield f'NearestPoint queries ({dims}-D)', time.perf_counter() - built
+
+
+def bench_sweep(points=1001, side=100):
+    """ Yield (method, seconds) rows for a side x side grid of (m, c) """
+    x = np.linspace(-1, 1, points)
+    grid = parameter_grid(m=np.linspace(-1, 1, side), c=np.linspace(0, 1, side))
+
+    start = time.perf_counter()
+    [simpson(linear(x, m, c), x) for m, c in zip(grid['m'], grid['c'])]
+    yield 'loop', time.perf_counter() - start
+
+    start = time.perf_counter()
+    sweep(linear, x, **grid)
+    yield 'broadcast', time.perf_counter() - start
+
+
+if __name__ == '__main__':
+
+    for name, (f, a, b, exact) in INTEGRANDS.items():
+        print(name)
+        print(f"  {'method':<10}{'evaluations':>12}{'abs error':>12}{'seconds':>12}")
+        rows = [('trapezoid', row) for row in bench_fixed(trapezoid, f, a, b, exact)]
+        rows += [('simpson', row) for row in bench_fixed(simpson, f, a, b, exact)]
+        rows += [('quad', row) for row in bench_quad(f, a, b, exact)]
+        for method, (evaluations, error, seconds) in rows:
+            print(f"  {method:<10}{evaluations:>12}{error:>12.2e}{seconds:>12.5f}")
+        print()
+
+    print(f"{'nearest index, 10^6 points x 10^5 queries':<44}{'seconds':>10}")
+    for method, seconds in bench_nearest():
+        print(f"  {method:<42}{seconds:>10.3f}")
+
+    print()
+    print(f"{'linear sweep, 10^4 (m, c) pairs':<44}{'seconds':>10}")
+    for method, seconds in bench_sweep():
+        print(f"  {method:<42}{seconds:>10.3f}")
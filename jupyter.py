@@ -9,3 +9,12 @@ x = np.linspace(0, 20, 100)
 # plt.plot(x, np.sin(x))
 # plt.show() 
 
+
+#%% Large traces: plot through the level-of-detail helper.
+from plotting import plot_lod
+
+# Un-comment to show plot...
+# x = np.linspace(0, 20, 10**8)
+# fig, ax = plt.subplots()
+# plot_lod(ax, x, np.sin(x))
+# plt.show()
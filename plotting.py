@@ -0,0 +1,258 @@
+""" plotting.py
+
+Level-of-detail plotting for large arrays, and headless batch rendering.
+
+Matplotlib draws every vertex it is given, which stalls on traces of 10^8
+samples while the screen only has a few thousand pixel columns. The helpers
+here keep the minimum and maximum of each pixel column (so peaks and the
+envelope survive) and hand only those to matplotlib, re-decimating the
+visible range whenever the x limits change.
+
+Batches of report figures are rendered with the Agg canvas (no pyplot, no
+display) across worker processes, each of which reuses one figure per
+size instead of building a new one for every spec.
+
+"""
+
+#%%
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Callable, Optional, Tuple
+
+import numpy as np
+import pytest
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+
+#%%
+#
+# Decimation.
+#
+
+def minmax_decimate(x, y, buckets, xmin=None, xmax=None):
+    """ Min and max of `y` in each of `buckets` equal-width x bins
+
+        `x` must be sorted. Only samples in [xmin, xmax] are used, plus one
+        either side so lines run off the edge of the view. Points come back
+        in x order, at most two per bucket; short inputs are returned as is.
+    """
+    x = np.asarray(x)
+    y = np.asarray(y)
+    xmin = x[0] if xmin is None else xmin
+    xmax = x[-1] if xmax is None else xmax
+
+    first = max(np.searchsorted(x, xmin, side='left') - 1, 0)
+    last = min(np.searchsorted(x, xmax, side='right') + 1, len(x))
+    x, y = x[first:last], y[first:last]
+    if len(x) <= 2 * buckets:
+        return x, y
+
+    edges = np.linspace(x[0], x[-1], buckets + 1)
+    starts = np.unique(np.searchsorted(x, edges[:-1], side='left'))
+    owner = np.repeat(np.arange(len(starts)), np.diff(np.append(starts, len(x))))
+
+    low = np.fmin.reduceat(y, starts)
+    high = np.fmax.reduceat(y, starts)
+    low_at = _first_where(y == low[owner], owner)
+    high_at = _first_where(y == high[owner], owner)
+
+    keep = np.unique(np.concatenate([low_at, high_at]))
+    return x[keep], y[keep]
+
+def _first_where(mask, owner):
+    """ First index where `mask` holds, for each owner that has one """
+    hits = np.flatnonzero(mask)
+    _, first = np.unique(owner[hits], return_index=True)
+    return hits[first]
+
+#%%
+#
+# Plotting.
+#
+
+class LODLine:
+    """ A line on `ax` that re-decimates `x`, `y` to the view on zoom """
+
+    def __init__(self, ax, x, y, buckets=None, **kwargs):
+        self.ax = ax
+        self.x = np.asarray(x)
+        self.y = np.asarray(y)
+        self.buckets = buckets
+        self.line, = ax.plot(*self._decimate(), **kwargs)
+        self._callback = ax.callbacks.connect('xlim_changed', self.update)
+
+    def _decimate(self, xmin=None, xmax=None):
+        buckets = self.buckets or max(int(self.ax.bbox.width), 1)
+        return minmax_decimate(self.x, self.y, buckets, xmin, xmax)
+
+    def update(self, ax=None):
+        """ Re-decimate for the current x limits """
+        xmin, xmax = sorted(self.ax.get_xlim())
+        self.line.set_data(*self._decimate(xmin, xmax))
+        self.ax.figure.canvas.draw_idle()
+
+    def disconnect(self):
+        self.ax.callbacks.disconnect(self._callback)
+
+def plot_lod(ax, x, y, buckets=None, **kwargs):
+    """ `ax.plot(x, y)` for large sorted `x`, decimated to the axes' pixels """
+    return LODLine(ax, x, y, buckets, **kwargs)
+
+#%%
+#
+# Batch rendering.
+#
+
+@dataclass
+class FigureSpec:
+    """ One figure to render to `path`
+
+        `kind` names the Axes method called with `data` and `options`, e.g.
+        'plot' or 'hist'. A module-level `draw(ax, *data, **options)` may be
+        given instead, so the spec can still be sent to a worker process.
+    """
+    path: str
+    data: tuple = ()
+    kind: str = 'plot'
+    draw: Optional[Callable] = None
+    options: dict = field(default_factory=dict)
+    title: str = ''
+    xlabel: str = ''
+    ylabel: str = ''
+    figsize: Tuple[float, float] = (6.4, 4.8)
+    dpi: int = 100
+
+@dataclass
+class RenderResult:
+    """ Where a figure was written and how long it took """
+    path: str
+    seconds: float
+
+@lru_cache(maxsize=8)
+def _canvas(figsize, dpi):
+    """ The figure this process reuses for `figsize` and `dpi`
+
+        Only the most recently used sizes are kept, so batches of mixed
+        sizes do not grow a worker without limit.
+    """
+    fig = Figure(figsize=figsize, dpi=dpi)
+    FigureCanvasAgg(fig)
+    return fig
+
+def render(spec):
+    """ Render `spec` to its path on a reused Agg figure """
+    start = time.perf_counter()
+    fig = _canvas(tuple(spec.figsize), spec.dpi)
+    # Clear the whole figure, so colorbars, twin axes or text a `draw` added
+    # do not carry over into the next spec.
+    fig.clear()
+    ax = fig.add_subplot()
+
+    if spec.draw is not None:
+        spec.draw(ax, *spec.data, **spec.options)
+    else:
+        getattr(ax, spec.kind)(*spec.data, **spec.options)
+    ax.set_title(spec.title)
+    ax.set_xlabel(spec.xlabel)
+    ax.set_ylabel(spec.ylabel)
+
+    fig.savefig(spec.path)
+    return RenderResult(path=spec.path, seconds=time.perf_counter() - start)
+
+def render_batch(specs, processes=None, chunksize=8):
+    """ Render `specs` across `processes` workers; results in spec order
+
+        `processes=1` renders in this process.
+    """
+    if processes == 1:
+        return [render(spec) for spec in specs]
+    with ProcessPoolExecutor(processes) as executor:
+        return list(executor.map(render, specs, chunksize=chunksize))
+
+#%%
+#
+# Tests.
+#
+
+def test_minmax_decimate_keeps_envelope():
+
+    x = np.linspace(0, 20, 100_000)
+    y = np.sin(x)
+    y[12_345] = 5.0
+
+    dx, dy = minmax_decimate(x, y, buckets=200)
+
+    assert len(dx) <= 400
+    assert np.all(np.diff(dx) > 0)
+    assert dy.max() == 5.0
+    assert dy.min() == pytest.approx(y.min())
+
+    short_x, short_y = minmax_decimate(x[:10], y[:10], buckets=200)
+    assert len(short_x) == 10
+
+
+def test_plot_lod_redecimates_on_zoom():
+
+    fig = Figure()
+    ax = fig.add_subplot()
+    x = np.linspace(0, 20, 1_000_000)
+
+    lod = plot_lod(ax, x, np.sin(x), buckets=500)
+    assert len(lod.line.get_xdata()) <= 1000
+
+    ax.set_xlim(1, 2)
+    zoomed = lod.line.get_xdata()
+    assert zoomed.min() < 1 and zoomed.max() > 2
+    assert np.count_nonzero((zoomed >= 1) & (zoomed <= 2)) > 500
+
+    lod.disconnect()
+
+
+def _draw_bars(ax, heights):
+    ax.bar(np.arange(len(heights)), heights)
+
+
+def _draw_annotated(ax, x, y):
+    ax.plot(x, y)
+    ax.twinx().plot(x, -y)
+    ax.figure.text(0.5, 0.5, "note")
+
+
+def test_render_resets_figure(tmp_path):
+
+    x = np.linspace(0, 1, 10)
+    render(FigureSpec(path=str(tmp_path / "a.png"), data=(x, x), draw=_draw_annotated))
+    render(FigureSpec(path=str(tmp_path / "b.png"), data=(x, x)))
+
+    fig = _canvas((6.4, 4.8), 100)
+    assert len(fig.axes) == 1
+    assert not fig.texts
+
+    for width in range(1, 12):
+        _canvas((width, 1), 100)
+    assert _canvas.cache_info().currsize <= 8
+
+
+def test_render_batch(tmp_path):
+
+    x = np.linspace(0, 20, 100)
+    specs = [FigureSpec(path=str(tmp_path / f"sin{i}.png"), data=(x, np.sin(i * x)),
+                        title=f"sin({i}x)") for i in range(4)]
+    specs.append(FigureSpec(path=str(tmp_path / "hist.png"), data=(np.sin(x),),
+                            kind='hist', options=dict(bins=10)))
+    specs.append(FigureSpec(path=str(tmp_path / "bars.png"), data=([1, 3, 2],),
+                            draw=_draw_bars, figsize=(3, 2)))
+
+    for processes in (1, 2):
+        results = render_batch(specs, processes=processes, chunksize=2)
+
+        assert [r.path for r in results] == [s.path for s in specs]
+        assert all(r.seconds > 0 for r in results)
+        for spec in specs:
+            with open(spec.path, 'rb') as png:
+                assert png.read(4) == b'\x89PNG'
+
+
+# %%
@@ -0,0 +1,429 @@
+""" Word count
+
+    A fused, streaming version of the `example_toolz` pipeline
+
+        wordcount = compose(frequencies, map(stem), str.split)
+
+    The toolz version stems every token, building three new strings each
+    time. Here tokens are counted raw first, one `Counter` per chunk, and
+    only the distinct tokens are stemmed (through a cache shared across
+    calls) when the counts are folded onto their stems. Files are read a
+    chunk at a time, so memory is bounded by the chunk and the vocabulary.
+
+    For map-reduce, files are cut into byte ranges that start and end on
+    whitespace and the ranges are dealt out to the worker processes. Each
+    worker merges the counts of its own ranges, so only one `Counter` per
+    worker is sent back, and the parent merges those pairwise in a tree.
+
+    For high-cardinality input an approximate mode keeps memory fixed: a
+    Count-Min sketch estimates any stem's frequency, and a Space-Saving
+    summary tracks the top-k heavy hitters.
+"""
+
+#%%
+import codecs
+import heapq
+import math
+import os
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+
+import numpy as np
+
+CHUNK_SIZE = 2**20
+
+
+def stem(word):
+    """ Stem word to primitive form """
+    return word.lower().rstrip(",.!:;'-\"").lstrip("'\"")
+
+
+# Exact counts share stems across chunks and calls; the approximate mode
+# stems without it so its memory stays that of its summaries.
+cached_stem = lru_cache(maxsize=2**20)(stem)
+
+
+def stem_counts(tokens, stem=cached_stem):
+    """ Fold counts of raw tokens onto their stems """
+    stems = Counter()
+    for token, count in tokens.items():
+        stems[stem(token)] += count
+    return stems
+
+
+def chunk_token_counts(chunks):
+    """ One `Counter` of whitespace-separated tokens per text chunk
+
+        A token split across two chunks is carried over and counted once.
+    """
+    carry = ''
+    for chunk in chunks:
+        if not chunk:
+            continue
+        chunk = carry + chunk
+        words = chunk.split()
+        carry = words.pop() if words and not chunk[-1].isspace() else ''
+        yield Counter(words)
+    if carry:
+        yield Counter([carry])
+
+
+def token_counts(chunks):
+    """ Count whitespace-separated tokens across text `chunks` """
+    tokens = Counter()
+    for counts in chunk_token_counts(chunks):
+        tokens.update(counts)
+    return tokens
+
+
+def wordcount(text):
+    """ Frequencies of the stems of the words of `text` """
+    return stem_counts(Counter(text.split()))
+
+
+def wordcount_chunks(chunks):
+    """ `wordcount` over an iterable of text chunks """
+    return stem_counts(token_counts(chunks))
+
+
+def read_chunks(path, chunk_size=CHUNK_SIZE, encoding='utf-8'):
+    """ Text of `path`, `chunk_size` characters at a time """
+    with open(path, encoding=encoding) as f:
+        yield from iter(lambda: f.read(chunk_size), '')
+
+
+def wordcount_file(path, chunk_size=CHUNK_SIZE, encoding='utf-8'):
+    """ `wordcount` of a file, read a chunk at a time """
+    return wordcount_chunks(read_chunks(path, chunk_size, encoding))
+
+#%%
+#
+# Map-reduce.
+#
+
+WHITESPACE = b' \t\n\r\x0b\x0c'
+
+
+def _next_whitespace(f, offset, size, block=4096):
+    """ First whitespace offset at or after `offset` in binary file `f` """
+    f.seek(offset)
+    while offset < size:
+        data = f.read(block)
+        for i, byte in enumerate(data):
+            if byte in WHITESPACE:
+                return offset + i
+        offset += len(data)
+    return size
+
+
+def byte_ranges(path, parts):
+    """ Up to `parts` (start, stop) byte ranges of `path` split on whitespace """
+    size = os.path.getsize(path)
+    with open(path, 'rb') as f:
+        cuts = [_next_whitespace(f, size * i // parts, size) for i in range(1, parts)]
+    bounds = sorted(set([0] + cuts + [size]))
+    return [(a, b) for a, b in zip(bounds[:-1], bounds[1:])]
+
+
+def read_range(path, start, stop, chunk_size=CHUNK_SIZE, encoding='utf-8'):
+    """ Text of bytes `start` to `stop` of `path`, a chunk at a time """
+    decoder = codecs.getincrementaldecoder(encoding)()
+    with open(path, 'rb') as f:
+        f.seek(start)
+        while start < stop:
+            data = f.read(min(chunk_size, stop - start))
+            if not data:
+                break
+            start += len(data)
+            yield decoder.decode(data, final=start >= stop)
+
+
+def wordcount_range(path, start, stop, chunk_size=CHUNK_SIZE, encoding='utf-8'):
+    """ `wordcount` of one byte range of a file """
+    return wordcount_chunks(read_range(path, start, stop, chunk_size, encoding))
+
+
+def merge(a, b):
+    """ Sum of two frequency counts """
+    a.update(b)
+    return a
+
+
+def tree_reduce(counts):
+    """ Merge frequency counts pairwise, a level at a time """
+    counts = list(counts) or [Counter()]
+    while len(counts) > 1:
+        odd = counts[-1:] if len(counts) % 2 else []
+        counts = [merge(a, b) for a, b in zip(counts[0::2], counts[1::2])] + odd
+    return counts[0]
+
+
+def wordcount_ranges(ranges, chunk_size=CHUNK_SIZE, encoding='utf-8'):
+    """ `wordcount` of several (path, start, stop) byte ranges together """
+    tokens = Counter()
+    for path, start, stop in ranges:
+        tokens.update(token_counts(read_range(path, start, stop, chunk_size, encoding)))
+    return stem_counts(tokens)
+
+
+def wordcount_parallel(paths, processes=None, chunk_size=CHUNK_SIZE,
+                       encoding='utf-8', parts_per_process=4):
+    """ `wordcount` of one or more files, map-reduced across processes """
+    if isinstance(paths, (str, os.PathLike)):
+        paths = [paths]
+    processes = processes or os.cpu_count()
+
+    total = sum(os.path.getsize(p) for p in paths) or 1
+    ranges = []
+    for path in paths:
+        parts = max(1, round(processes * parts_per_process * os.path.getsize(path) / total))
+        ranges += [(path, a, b) for a, b in byte_ranges(path, parts)]
+
+    # Merging happens in the workers; only one Counter per worker is pickled.
+    groups = [ranges[i::processes] for i in range(processes) if ranges[i::processes]]
+    with ProcessPoolExecutor(processes) as executor:
+        counts = executor.map(wordcount_ranges, groups,
+                              [chunk_size] * len(groups), [encoding] * len(groups))
+        return tree_reduce(counts)
+
+#%%
+#
+# Approximate.
+#
+# Each chunk is still counted exactly (its vocabulary is bounded by the
+# chunk), then its distinct stems and counts are added to the summaries in
+# one batch. Stems are hashed with `hash`, so a sketch is only meaningful
+# within the process that built it.
+#
+
+class CountMinSketch:
+    """ Count-Min sketch of `depth` rows of `width` counters
+
+        Estimates never undercount; with width e/epsilon and depth
+        ln(1/delta) they overcount by at most epsilon * total with
+        probability 1 - delta.
+    """
+
+    def __init__(self, width, depth, seed=0):
+        self.width = 1 << max(int(width) - 1, 1).bit_length()
+        self.depth = int(depth)
+        self.total = 0
+        self.table = np.zeros((self.depth, self.width), dtype=np.int64)
+        rng = np.random.default_rng(seed)
+        self._a = rng.integers(0, 2**63, self.depth, dtype=np.uint64) * 2 + 1
+        self._b = rng.integers(0, 2**63, self.depth, dtype=np.uint64)
+        self._shift = np.uint64(64 - self.width.bit_length() + 1)
+
+    @classmethod
+    def from_error(cls, epsilon=1e-4, delta=1e-3, max_bytes=None, seed=0):
+        """ Sketch for the error bounds, shrunk to fit `max_bytes` if given """
+        # Widths are powers of two: round up to meet epsilon, and only round
+        # down when the memory ceiling binds.
+        width = 1 << max(math.ceil(math.e / epsilon) - 1, 1).bit_length()
+        depth = max(math.ceil(math.log(1 / delta)), 1)
+        if max_bytes is not None:
+            ceiling = max_bytes // (8 * depth)
+            if ceiling < 2:
+                raise ValueError(f"max_bytes={max_bytes} is too small for depth {depth}")
+            width = min(width, 1 << (ceiling.bit_length() - 1))
+        return cls(width, depth, seed)
+
+    @property
+    def epsilon(self):
+        return math.e / self.width
+
+    @property
+    def nbytes(self):
+        return self.table.nbytes
+
+    def _columns(self, items):
+        keys = np.fromiter((hash(i) for i in items), dtype=np.int64,
+                           count=len(items)).view(np.uint64)
+        return (self._a[:, None] * keys[None, :] + self._b[:, None]) >> self._shift
+
+    def update(self, items, counts):
+        """ Add `counts` to `items` (sequences of equal length) """
+        items, counts = list(items), np.asarray(list(counts), dtype=np.int64)
+        columns = self._columns(items)
+        for row, cols in zip(self.table, columns):
+            np.add.at(row, cols, counts)
+        self.total += int(counts.sum())
+
+    def estimate(self, items):
+        """ Estimated count of each of `items` """
+        items = list(items)
+        columns = self._columns(items)
+        return self.table[np.arange(self.depth)[:, None], columns].min(axis=0)
+
+
+class SpaceSaving:
+    """ Space-Saving summary of the `k` heaviest items
+
+        A monitored item's count overestimates its true count by at most
+        its `errors` entry, and any item heavier than total / k is monitored.
+    """
+
+    def __init__(self, k):
+        self.k = k
+        self.counts = {}
+        self.errors = {}
+        self._heap = []
+
+    def update(self, item, count=1):
+        counts = self.counts
+        if item in counts:
+            counts[item] += count
+        elif len(counts) < self.k:
+            counts[item] = count
+            self.errors[item] = 0
+        else:
+            floor, victim = self._pop_min()
+            del counts[victim], self.errors[victim]
+            counts[item] = floor + count
+            self.errors[item] = floor
+        heapq.heappush(self._heap, (counts[item], item))
+        if len(self._heap) > 4 * self.k:
+            self._heap = [(c, i) for i, c in counts.items()]
+            heapq.heapify(self._heap)
+
+    def _pop_min(self):
+        """ Least monitored (count, item), skipping stale heap entries """
+        while True:
+            count, item = heapq.heappop(self._heap)
+            if self.counts.get(item) == count:
+                return count, item
+
+    def top(self, n=None):
+        """ Up to `n` (item, count) pairs, heaviest first """
+        return Counter(self.counts).most_common(n)
+
+
+class ApproximateWordCount:
+    """ Fixed-memory `wordcount`: estimates from a Count-Min sketch, heavy
+        hitters from a Space-Saving summary
+
+        The summary monitors `counters` stems (10 * k by default) so that the
+        reported top `k` are well clear of its eviction floor, and reports
+        the smaller of its count and the sketch's, both being upper bounds.
+    """
+
+    def __init__(self, k=100, epsilon=1e-4, delta=1e-3, max_bytes=None,
+                 counters=None):
+        self.k = k
+        self.sketch = CountMinSketch.from_error(epsilon, delta, max_bytes)
+        self.heavy = SpaceSaving(counters or 10 * k)
+
+    def update(self, stems):
+        """ Add a `Counter` of stems """
+        self.sketch.update(stems.keys(), stems.values())
+        # Heaviest first, so they are monitored before the long tail churns.
+        for item, count in stems.most_common():
+            self.heavy.update(item, count)
+        return self
+
+    def update_chunks(self, chunks):
+        for tokens in chunk_token_counts(chunks):
+            self.update(stem_counts(tokens, stem))
+        return self
+
+    def estimate(self, *stems):
+        return dict(zip(stems, self.sketch.estimate(stems).tolist()))
+
+    def top(self, n=None):
+        """ Up to `n` (default k) heaviest (stem, estimated count) pairs """
+        candidates = self.heavy.top()
+        estimates = self.sketch.estimate([item for item, _ in candidates])
+        counts = Counter({item: min(count, int(estimate)) for (item, count), estimate
+                          in zip(candidates, estimates)})
+        return counts.most_common(n or self.k)
+
+
+def wordcount_approx(text, **options):
+    """ `ApproximateWordCount` of `text`; see its options """
+    return ApproximateWordCount(**options).update_chunks([text])
+
+
+def wordcount_approx_file(path, chunk_size=CHUNK_SIZE, encoding='utf-8', **options):
+    """ `ApproximateWordCount` of a file, read a chunk at a time """
+    return ApproximateWordCount(**options).update_chunks(
+        read_chunks(path, chunk_size, encoding))
+
+#%%
+#
+# Tests.
+#
+
+SENTENCE = "This cat jumped over this other cat!"
+
+
+def test_wordcount():
+
+    from toolz import compose, frequencies
+    from toolz.curried import map
+
+    toolz_wordcount = compose(frequencies, map(stem), str.split)
+
+    assert wordcount(SENTENCE) == {'this': 2, 'cat': 2, 'jumped': 1, 'over': 1, 'other': 1}
+    assert wordcount(SENTENCE * 3) == toolz_wordcount(SENTENCE * 3)
+
+
+def test_wordcount_file(tmp_path):
+
+    path = tmp_path / "corpus.txt"
+    text = "\n".join([SENTENCE, "  'Cat' OVER, over -- the cat.  "] * 50)
+    path.write_text(text)
+
+    for chunk_size in (1, 7, 64, CHUNK_SIZE):
+        assert wordcount_file(path, chunk_size) == wordcount(text)
+
+
+def test_wordcount_parallel(tmp_path):
+
+    text = "\n".join([SENTENCE, "  'Caf\u00e9' OVER, over -- the cat.  "] * 50)
+    first, second = tmp_path / "first.txt", tmp_path / "second.txt"
+    first.write_text(text, encoding='utf-8')
+    second.write_text(SENTENCE, encoding='utf-8')
+
+    ranges = byte_ranges(first, 9)
+    assert ranges[0][0] == 0 and ranges[-1][1] == first.stat().st_size
+    assert all(a == b for (_, a), (b, _) in zip(ranges[:-1], ranges[1:]))
+
+    expected = wordcount(text + " " + SENTENCE)
+    assert wordcount_parallel([first, second], processes=2, chunk_size=5) == expected
+    assert tree_reduce([Counter(a=1), Counter(a=2, b=1), Counter(b=3)]) == Counter(a=3, b=4)
+    assert wordcount_ranges([(first, a, b) for a, b in ranges]) == wordcount(text)
+
+
+def test_count_min_sketch():
+
+    exact = Counter({f"w{i}": (i % 17) + 1 for i in range(5000)})
+    sketch = CountMinSketch.from_error(epsilon=1e-3, delta=1e-3)
+    sketch.update(exact.keys(), exact.values())
+
+    estimates = sketch.estimate(exact.keys())
+    overcount = estimates - np.array(list(exact.values()))
+
+    assert (overcount >= 0).all()
+    assert (overcount <= sketch.epsilon * sketch.total).mean() > 0.99
+    assert CountMinSketch.from_error(max_bytes=4096).nbytes <= 4096
+
+    loose = CountMinSketch.from_error(epsilon=1e-4, delta=1e-3, max_bytes=2**30)
+    assert loose.epsilon <= 1e-4
+    assert loose.width == CountMinSketch.from_error(epsilon=1e-4, delta=1e-3).width
+
+
+def test_wordcount_approx():
+
+    words = [f"w{i}" for i in range(2000)]
+    text = " ".join(words + ["The", "cat,", "cat"] * 300 + ["dog"] * 200)
+    exact = wordcount(text)
+
+    cached = cached_stem.cache_info().currsize
+    approx = wordcount_approx(text, k=5, epsilon=1e-3)
+    assert cached_stem.cache_info().currsize == cached
+
+    assert approx.top(3) == [('cat', 600), ('the', 300), ('dog', 200)]
+    assert approx.top(3) == exact.most_common(3)
+    assert approx.estimate('cat')['cat'] >= 600
+    assert approx.estimate('w7')['w7'] >= 1
@@ -0,0 +1,101 @@
+"""
+Word count benchmark.
+
+Writes a synthetic corpus and times the toolz pipeline (on a sample), the
+fused single-process count, and the map-reduce count from 1 to N cores;
+then compares the exact count with the approximate (Count-Min sketch and
+Space-Saving) mode for time, memory and top-k accuracy.
+
+    python wordcount_benchmark.py [corpus MB]     # default 256; try 4096
+
+"""
+
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+from toolz import compose, frequencies
+from toolz.curried import map
+
+from wordcount import stem, wordcount_approx_file, wordcount_file, wordcount_parallel
+
+toolz_wordcount = compose(frequencies, map(stem), str.split)
+
+PUNCTUATION = ['', '', '', '', ',', '.', '!', ';', "'"]
+
+
+def write_corpus(path, megabytes, vocabulary=50_000, seed=0):
+    """ Zipf-distributed words with some punctuation and capitals """
+    rng = np.random.default_rng(seed)
+    words = [f"word{i}" for i in range(vocabulary)]
+    words = words + [w.capitalize() for w in words[:1000]]
+    with open(path, 'w') as f:
+        while f.tell() < megabytes * 2**20:
+            ranks = np.minimum(rng.zipf(1.3, 100_000), len(words)) - 1
+            marks = rng.integers(0, len(PUNCTUATION), len(ranks))
+            f.write(' '.join(words[r] + PUNCTUATION[m] for r, m in zip(ranks, marks)))
+            f.write('\n')
+
+
+def timed(func, *args, **kwargs):
+    start = time.perf_counter()
+    func(*args, **kwargs)
+    return time.perf_counter() - start
+
+
+def bench_wordcount(path, sample_bytes=16 * 2**20):
+    """ Yield (method, MB/sec) rows """
+    size = os.path.getsize(path)
+    mb = size / 2**20
+
+    with open(path) as f:
+        sample = f.read(sample_bytes)
+    yield 'toolz (sample)', len(sample) / 2**20 / timed(toolz_wordcount, sample)
+
+    yield 'fused, 1 process', mb / timed(wordcount_file, path)
+
+    for processes in range(1, os.cpu_count() + 1):
+        yield f'map-reduce, {processes} cores', \
+            mb / timed(wordcount_parallel, path, processes=processes)
+
+
+def bench_approx(path, k=100, epsilon=1e-4, delta=1e-3, max_bytes=2**20):
+    """ Yield (mode, seconds, summary bytes, top-k recall, max top-k error) rows """
+    start = time.perf_counter()
+    exact = wordcount_file(path)
+    seconds = time.perf_counter() - start
+    # Dict table plus the stem strings themselves.
+    size = sys.getsizeof(exact) + sum(sys.getsizeof(w) for w in exact)
+    truth = exact.most_common(k)
+    yield 'exact', seconds, size, 1.0, 0.0
+
+    start = time.perf_counter()
+    approx = wordcount_approx_file(path, k=k, epsilon=epsilon, delta=delta,
+                                   max_bytes=max_bytes)
+    seconds = time.perf_counter() - start
+    size = approx.sketch.nbytes + sum(sys.getsizeof(w) for w in approx.heavy.counts) \
+        + 2 * sys.getsizeof(approx.heavy.counts)
+    found = dict(approx.top(k))
+    recall = len(found.keys() & dict(truth).keys()) / k
+    error = max(abs(found.get(w, 0) - c) / c for w, c in truth)
+    yield 'approximate', seconds, size, recall, error
+
+
+if __name__ == '__main__':
+
+    megabytes = int(sys.argv[1]) if len(sys.argv) > 1 else 256
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'corpus.txt')
+        write_corpus(path, megabytes)
+        print(f"corpus: {os.path.getsize(path) / 2**20:,.0f} MB")
+        print(f"{'method':<24}{'MB/sec':>10}")
+        for method, rate in bench_wordcount(path):
+            print(f"{method:<24}{rate:>10.1f}")
+
+        print()
+        print(f"{'mode':<14}{'seconds':>10}{'bytes':>14}{'top-k recall':>14}{'max error':>12}")
+        for mode, seconds, size, recall, error in bench_approx(path):
+            print(f"{mode:<14}{seconds:>10.2f}{size:>14,}{recall:>14.2f}{error:>12.2%}")